@@ -1,51 +1,167 @@
 import math
+
+import numpy as np
 import pandas as pd
 
 
 class BotTemplate:
+    # Indicators the bot uses, so the simulator can subscribe it to the shared indicator registry
+    indicator_kinds = ()
+
+    # All state of a bot is in slots, so bots are small and fast to create, copy and send to other processes.
+    # A strategy declares the slots of its own state and implements trade(hist_data)
+    __slots__ = ('cash', 'value', 'alfa', 'tickers', 'columns', 'positions', 'rows', 'row_count', 'dates',
+                 'indicators', 'costs', '_hist_frame')
+
+    # Columns of the history before the traded amount of every stock
+    hist_columns = ['cash', 'value', 'var']
+
     def __init__(self, start_cash):
         """
         Creates a Bot that makes a trading decision based on the incoming data
         :param start_cash: double of amount of cash that the bot starts with in the beginning
         """
         self.cash = start_cash  # Cash available for bot
-        self.stocks = dict()  # Amount of stocks the bot has
         self.value = self.cash  # The total value the bot possesses
+        self.alfa = None  # Parameter of the strategy, e.g. its window size
+
+        # Amount of every stock the bot has, in the same order as the columns of the price matrix
+        self.tickers = list()
+        self.columns = dict()  # Ticker -> index in positions
+        self.positions = np.zeros(0)
 
-        self.hist_trade = pd.DataFrame()  # All the trade history of the bot
-        self.hist_trade['cash'] = self.cash  # All the historical value of the bot
-        self.hist_trade['value'] = self.cash  # All the historical cash of the bot
-        self.hist_trade['var'] = 0 # All the historical variables of the bot
+        # All the trade history of the bot: one row (cash, value, var, traded amount per stock) per time step.
+        # The rows are kept in a growing array and only turned into the hist_trade dataframe when it is used
+        self.rows = np.empty((0, len(self.hist_columns)))
+        self.row_count = 0
+        self.dates = list()
+        self._hist_frame = None
+
+        self.indicators = None  # Shared indicator registry of the simulator, None if the bot calculates them itself
+        self.costs = None  # Transaction cost model of the simulator, None to fill at the last price without costs
 
     def initiate(self, name_list: list):
         """
-        Fill stock dataframe with the names of the stocks
-        :param name_list: list with all names of the stocks
+        Fill the positions and history columns with the names of the stocks
+        :param name_list: list with all names of the stocks, in the order of the columns of the price data
+        """
+        self.tickers = list(name_list)
+        self.columns = {name: i for i, name in enumerate(self.tickers)}
+        self.positions = np.zeros(len(self.tickers))
+
+        # Start with room for some rows, the array doubles when it is full
+        self.rows = np.empty((16, len(self.hist_columns) + len(self.tickers)))
+        self.row_count = 0
+        self.dates = list()
+        self._hist_frame = None
+
+    @property
+    def stocks(self):
+        """Dictionary with the amount of every stock the bot has (a copy, trade through buy and sell)"""
+        return dict(zip(self.tickers, self.positions.tolist()))
+
+    def position(self, ticker):
+        """Amount of a stock the bot has"""
+        return self.positions[self.columns[ticker]]
+
+    @property
+    def hist_trade(self):
+        """All the trade history of the bot as dataframe with the dates as index"""
+        if self._hist_frame is None:
+            self._hist_frame = pd.DataFrame(self.rows[:self.row_count].copy(),
+                                            index=pd.DatetimeIndex(self.dates, name='Date'),
+                                            columns=self.hist_columns + self.tickers)
+        return self._hist_frame
+
+    @hist_trade.setter
+    def hist_trade(self, hist_trade: pd.DataFrame):
+        """Replaces the trade history, e.g. when a checkpoint is loaded or the history is exported"""
+        self.rows = hist_trade.to_numpy(dtype='float64').copy()
+        self.row_count = len(self.rows)
+        self.dates = list(hist_trade.index)
+        self._hist_frame = None
+
+    def history_since(self, row):
+        """
+        Trade history from a row on as dataframe, without building the dataframe of the whole history
+        :param row: integer amount of rows to skip, e.g. the rows that were already saved
         """
+        return pd.DataFrame(self.rows[row:self.row_count].copy(), index=pd.DatetimeIndex(self.dates[row:], name='Date'),
+                            columns=self.hist_columns + self.tickers)
+
+    def __getstate__(self):
+        """Compact state for pickling: the slots in a fixed order, without the shared registry and the cached frame"""
+        state = {name: getattr(self, name, None) for name in self.slot_names()}
+        state['indicators'] = None
+        state['_hist_frame'] = None
+
+        # Only the used rows of the history, and the dates as one int64 array instead of separate timestamps
+        state['rows'] = self.rows[:self.row_count]
+        state['dates'] = pd.DatetimeIndex(self.dates)
+
+        # A strategy without its own slots keeps its attributes in a dictionary, they are kept as well
+        return tuple(state.values()), getattr(self, '__dict__', None)
+
+    def __setstate__(self, state):
+        """Restores a bot from the state made by __getstate__"""
+        slots, attributes = state
+        for name, value in zip(self.slot_names(), slots):
+            setattr(self, name, value)
+        self.dates = list(self.dates)
+        if attributes:
+            self.__dict__.update(attributes)
+
+    def snapshot(self):
+        """State of the bot before a decision, so the decision can be undone with restore (e.g. when it is too late)"""
+        state = {name: getattr(self, name, None) for name in self.slot_names()}
+
+        # Only the positions are changed in place, new history rows are only added after the saved row count
+        state['positions'] = self.positions.copy()
+        state['dates'] = len(self.dates)
+
+        # Attributes of a strategy without its own slots
+        if hasattr(self, '__dict__'):
+            state['__dict__'] = dict(self.__dict__)
+        return state
+
+    def restore(self, state):
+        """Undoes everything the bot did since the snapshot was taken"""
+        for name, value in state.items():
+            if name not in ('dates', '__dict__'):
+                setattr(self, name, value)
+        del self.dates[state['dates']:]
+        self._hist_frame = None
+
+        if '__dict__' in state:
+            self.__dict__.clear()
+            self.__dict__.update(state['__dict__'])
+
+    @classmethod
+    def slot_names(cls):
+        """Names of all slots of the class and its parents"""
+        return [name for klass in reversed(cls.__mro__) for name in getattr(klass, '__slots__', ())]
+
+    def get_indicator(self, kind, ticker, hist_data: pd.DataFrame):
+        """
+        Gets an indicator from the shared registry of the simulator
+        :param kind: type of indicator, e.g. 'rsi'
+        :param ticker: name of the stock the indicator is calculated on
+        :param hist_data: matrix of a set of historical values for the given stocks
+        :return: value of the indicator for the last row of hist_data, None if there is no registry
+        """
+        if self.indicators is None:
+            return None
 
-        # fill stock and hist_trade dataframe with stock tickers
-        for name in name_list:
-            self.stocks[name] = 0
-            self.hist_trade[name] = 0
+        return self.indicators.get(kind, ticker, self.alfa, len(hist_data))
 
     def calc_worth(self, hist_data: pd.DataFrame):
         """
         Calculate worth of cash and all stocks combined
         :param hist_data: matrix of a set of historical values for the given stocks
         """
-
-        # begin with the cash
-        worth = self.cash
-
-        # add the value of each stock to the worth
-        for i in self.stocks:
-            stock_amount = self.stocks[i]
-            stock_price_row = hist_data.iloc[-1]
-            stock_price = stock_price_row[i]
-            worth = worth + stock_amount * stock_price
-
-        # save worth
-        self.value = worth
+        # The positions are in the order of the price columns, so the worth is the cash plus one dot product
+        stock_prices = hist_data.iloc[-1].to_numpy(dtype='float64')
+        self.value = self.cash + float(np.dot(self.positions, stock_prices))
 
     def buy(self, stock_ticker, hist_data):
         """
@@ -55,9 +171,18 @@ class BotTemplate:
         """
 
         current_stock_price = hist_data.iloc[-1].loc[stock_ticker]
-        stock_amount = math.floor(self.cash / current_stock_price)
-        total_stock_value = stock_amount * current_stock_price
-        self.stocks[stock_ticker] = self.stocks[stock_ticker] + stock_amount  # add stock
+
+        # With a cost model the stock is bought above the last price and a fee is paid
+        if self.costs is not None:
+            fill_price = self.costs.fill_price(current_stock_price, 1)
+            stock_amount = self.costs.affordable(self.cash, fill_price)
+            total_stock_value = stock_amount * fill_price
+            total_stock_value = total_stock_value + self.costs.fee(total_stock_value)
+        else:
+            stock_amount = math.floor(self.cash / current_stock_price)
+            total_stock_value = stock_amount * current_stock_price
+
+        self.positions[self.columns[stock_ticker]] += stock_amount  # add stock
         self.cash = self.cash - total_stock_value  # subtract cash
 
         return stock_amount
@@ -70,9 +195,15 @@ class BotTemplate:
         """
 
         current_stock_price = hist_data.iloc[-1].loc[stock_ticker]
-        total_stock_value = self.stocks[stock_ticker] * current_stock_price
-        stock_amount = self.stocks[stock_ticker]
-        self.stocks[stock_ticker] = 0
+        stock_amount = self.position(stock_ticker)
+        total_stock_value = stock_amount * current_stock_price
+
+        # With a cost model the stock is sold below the last price and a fee is paid
+        if self.costs is not None:
+            total_stock_value = stock_amount * self.costs.fill_price(current_stock_price, -1)
+            total_stock_value = total_stock_value - self.costs.fee(total_stock_value)
+
+        self.positions[self.columns[stock_ticker]] = 0
         self.cash = self.cash + total_stock_value
 
         return -1 * stock_amount
@@ -85,16 +216,18 @@ class BotTemplate:
         :param date: the time stamp for this save
         :param var_data: the data where the decision was based on, e.g. RSI. = 0 if not specified
         """
-        # Make new entry and fill with correct keys
-        new_entry = pd.Series(self.stocks).astype('float64')
-        for key in self.hist_trade.columns:
-            new_entry[key] = 0
-        new_entry['cash'] = self.cash
-        new_entry['value'] = self.value
-        new_entry['var'] = var_data
-        new_entry[ticker] = stock_amount
-
-        row_date = {0: date}
-        self.hist_trade = pd.concat([self.hist_trade,
-                                     pd.DataFrame(new_entry).transpose().rename(row_date)])
-        self.hist_trade = self.hist_trade.rename_axis('Date')
\ No newline at end of file
+        # Double the history array when it is full
+        if self.row_count == len(self.rows):
+            self.rows = np.concatenate([self.rows, np.empty((max(len(self.rows), 16), self.rows.shape[1]))])
+
+        # Make new entry: cash, value, var and only the traded amount of this stock
+        row = self.rows[self.row_count]
+        row[:] = 0
+        row[0] = self.cash
+        row[1] = self.value
+        row[2] = var_data
+        row[len(self.hist_columns) + self.columns[ticker]] = stock_amount
+
+        self.dates.append(date)
+        self.row_count = self.row_count + 1
+        self._hist_frame = None
@@ -4,6 +4,9 @@ from bot import BotTemplate
 
 
 class BotDHL(BotTemplate):
+    indicator_kinds = ('high', 'low')
+    __slots__ = ('last_daily_low', 'last_daily_high', 'last_window_check', 'is_first')
+
     def __init__(self, start_cash, window_size: int):
         """
         Creates a bot with daily high low trading strategy
@@ -32,18 +35,25 @@ class BotDHL(BotTemplate):
 
         # if we traded for a full window recalculate the daily high low
         if self.last_window_check > self.last_window_check or self.is_first:
-            last_day = hist_data.iloc[-(self.alfa+1):-1]  # select last day
-            self.dhl(last_day)  # recalculate last daily high low
+            # Use the shared indicator registry if the simulator provides one, else calculate it here
+            last_daily_high = self.get_indicator('high', key, hist_data)
+            if last_daily_high is None:
+                last_day = hist_data.iloc[-(self.alfa+1):-1]  # select last day
+                self.dhl(last_day)  # recalculate last daily high low
+            else:
+                self.last_daily_high = last_daily_high
+                self.last_daily_low = self.get_indicator('low', key, hist_data)
+                self.last_window_check = 0  # reset the last time the new window was calculated
             self.is_first = 0  # reset is first time
 
         # if the value now is more than the last daily high, buy
         if hist_data.iloc[-1, 0] > self.last_daily_high:
-            if self.stocks[key] == 0:
+            if self.position(key) == 0:
                 stock_amount = self.buy(key, hist_data)
 
         # if the value now is less than the last daily low, sell
         if hist_data.iloc[-1, 0] < self.last_daily_low:
-            if self.stocks[key] != 0:
+            if self.position(key) != 0:
                 stock_amount = self.sell(key, hist_data)
 
         # save all data for analyzing later
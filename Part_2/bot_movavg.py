@@ -5,6 +5,9 @@ from bot import BotTemplate
 
 
 class BotMovingAverage(BotTemplate):
+    indicator_kinds = ('mov_avg',)
+    __slots__ = ()
+
     def __init__(self, start_cash, window_size: int):
         """
         Creates a specific trading strategy bot
@@ -19,58 +22,40 @@ class BotMovingAverage(BotTemplate):
         Makes trading decisions based on the incoming historical data
         :param hist_data: matrix of a set of historical values for the given stocks
         """
-        moving_average = self.mov_avg(hist_data)
-        # If moving_average failed, just return
-        if isinstance(moving_average, int):
+        key = hist_data.columns[0]  # Get key from first stock
+
+        # Use the shared indicator registry if the simulator provides one, else calculate it here
+        moving_average = self.get_indicator('mov_avg', key, hist_data)
+        if moving_average is None:
+            moving_averages = self.mov_avg(hist_data)
+            # If moving_average failed, just return
+            if isinstance(moving_averages, int):
+                return
+            moving_average = moving_averages.at[key]
+        # If there is not enough data for the moving average yet, just return
+        elif math.isnan(moving_average):
             return
 
-        # make new entry
-        new_entry = pd.Series(self.stocks).astype('float64')
-        new_entry['cash'] = 0
-        new_entry['value'] = 0
-        new_entry['var'] = 0
-        for key in self.hist_trade.columns:
-            new_entry[key] = 0
-
-        key = moving_average.index[0]  # Get key from first stock
         current_value = hist_data.iloc[-1].values[0]  # select last value as current value
+        stock_amount = 0
 
         # If the moving average is larger than the current value of the stock
-        if moving_average.at[key] >= current_value:
+        if moving_average >= current_value:
             # If stock is not bought yet, buy
-            if self.stocks[key] == 0:
-                # Buy
-                stock_amount = math.floor(self.cash / current_value)
-                value = stock_amount * current_value
-                self.stocks[key] = self.stocks[key] + stock_amount  # add stock
-                self.cash = self.cash - value  # subtract cash
-
-                new_entry[key] = stock_amount
+            if self.position(key) == 0:
+                stock_amount = self.buy(key, hist_data)
 
         # If the moving average is smaller than the current value of the stock
         else:
-            # If stock is already bought
-            if self.stocks[key] != 0:
-                # Sell
-                value = self.stocks[key] * current_value
-                stock_amount = self.stocks[key]
-                self.stocks[key] = 0
-                self.cash = self.cash + value
-
-                new_entry[key] = -1*stock_amount
+            # If stock is already bought, sell
+            if self.position(key) != 0:
+                stock_amount = self.sell(key, hist_data)
 
         # Calculate the total value of the portfolio
         self.calc_worth(hist_data)
 
-        new_entry['cash'] = self.cash
-        new_entry['value'] = self.value
-        new_entry['var'] = moving_average.at[key]
-
-        row_date = {0: hist_data.index[-1]}
-
-        self.hist_trade = pd.concat([self.hist_trade,
-                                     pd.DataFrame(new_entry).transpose().rename(row_date)])
-        self.hist_trade = self.hist_trade.rename_axis('Date')
+        # Save the data in the history
+        self.save_hist(key, stock_amount, hist_data.index[-1], moving_average)
 
     def mov_avg(self, hist_data: pd.DataFrame):
         """
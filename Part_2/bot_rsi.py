@@ -3,6 +3,8 @@ import pandas as pd
 
 
 class BotRSI(BotTemplate):
+    indicator_kinds = ('rsi',)
+    __slots__ = ()
 
     def __init__(self, start_cash, window_size: int):
         """
@@ -15,9 +17,13 @@ class BotRSI(BotTemplate):
 
     def trade(self, hist_data: pd.DataFrame):
         """Lets the bot either buy a stock, sell a stock or do nothing based on the RSI (overbought / oversold)"""
-        rsi = self.calculate_rsi(hist_data)
         stock_ticker = hist_data.columns[0]
 
+        # Use the shared indicator registry if the simulator provides one, else calculate it here
+        rsi = self.get_indicator('rsi', stock_ticker, hist_data)
+        if rsi is None:
+            rsi = self.calculate_rsi(hist_data)
+
         # If relative strength index <= 30, means oversold: so buy
         if rsi <= 30:
             stock_amount = self.buy(stock_ticker, hist_data)
@@ -55,8 +61,8 @@ class BotRSI(BotTemplate):
         change_up[change_up < 0] = 0
         change_down[change_down > 0] = 0
 
-        # Make sure window is never be bigger than the current available data
-        if len(hist_data.index) < self.alfa:
+        # Make sure window is never bigger than the amount of changes, one less than the available data
+        if len(hist_data.index) < self.alfa + 1:
             window = len(hist_data.index) - 1
         else:
             window = self.alfa
@@ -0,0 +1,136 @@
+import copy
+import os
+import pickle
+import threading
+
+import pandas as pd
+
+
+class Checkpoint:
+    def __init__(self, directory, every=100):
+        """
+        Creates a checkpoint of a simulation on disk, so a long run can be resumed after it was stopped
+        :param directory: folder the checkpoint files are written to
+        :param every: integer amount of cycles between two checkpoints
+        """
+        self.directory = directory
+        self.every = every
+
+        # The state (cursor and bots without their history) is replaced every checkpoint, the history only grows
+        self.state_path = os.path.join(directory, "state.pkl")
+        self.ledger_path = os.path.join(directory, "ledger.pkl")
+
+        self.saved_rows = list()  # Amount of history rows of every bot that is already in the ledger
+        self.ledger_size = 0  # Amount of bytes of the ledger that belong to the last complete checkpoint
+        self.writer = None  # Background thread writing the last checkpoint
+
+    def start(self, bots: list):
+        """
+        Starts a new checkpoint for a run, removing the files of an earlier run
+        :param bots: list of all bots in the simulation
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        for path in (self.state_path, self.ledger_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        self.saved_rows = [0] * len(bots)
+        self.ledger_size = 0
+
+    def due(self, cycle: int):
+        """Returns True if a checkpoint has to be written after this integer amount of simulated cycles"""
+        return cycle % self.every == 0
+
+    def save(self, cursor: int, first: int, last: int, bots: list, active_bots: list, pruner=None):
+        """
+        Writes a checkpoint in the background, only the history rows added since the last checkpoint are written
+        :param cursor: integer amount of rows the bots get in the next cycle
+        :param first: integer amount of rows the bots got in the first cycle
+        :param last: integer amount of rows after which the simulation stops
+        :param bots: list of all bots in the simulation
+        :param active_bots: list of the bots that are not pruned
+        :param pruner: optional pruning scheduler of the run, its report is saved too
+        """
+        # Only one checkpoint is written at a time, so the files always belong to one complete checkpoint
+        self.wait()
+
+        # Copy the state now, the bots keep trading while the checkpoint is written
+        snapshots = list()
+        deltas = list()
+        for i, bot in enumerate(bots):
+            snapshot = copy.copy(bot)
+            snapshot.hist_trade = bot.history_since(bot.row_count)
+            snapshot.indicators = None
+            snapshots.append(snapshot)
+
+            # New rows of the history since the last checkpoint, without touching the rows that are already saved
+            if bot.row_count > self.saved_rows[i]:
+                deltas.append((i, bot.history_since(self.saved_rows[i])))
+                self.saved_rows[i] = bot.row_count
+
+        active = set(map(id, active_bots))
+        state = pickle.dumps({'cursor': cursor, 'first': first, 'last': last, 'bots': snapshots,
+                              'active': [i for i, bot in enumerate(bots) if id(bot) in active],
+                              'saved_rows': list(self.saved_rows),
+                              'pruned': list(pruner.pruned) if pruner is not None else None},
+                             protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.writer = threading.Thread(target=self.write, args=(state, deltas))
+        self.writer.start()
+
+    def write(self, state: bytes, deltas: list):
+        """Appends the new history rows to the ledger and then replaces the state file (runs in the background)"""
+        with open(self.ledger_path, "ab") as file:
+            for delta in deltas:
+                pickle.dump(delta, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+            ledger_size = file.tell()
+
+        # The state is replaced at once, so a stopped run never leaves a half written checkpoint behind
+        state = pickle.dumps({'ledger_size': ledger_size, 'state': state}, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(self.state_path + ".tmp", "wb") as file:
+            file.write(state)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+        self.ledger_size = ledger_size
+
+    def wait(self):
+        """Waits until the last checkpoint is written"""
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+    def exists(self):
+        """Returns True if there is a checkpoint to resume from"""
+        return os.path.exists(self.state_path)
+
+    def load(self):
+        """
+        Loads the last complete checkpoint and rebuilds the history of every bot
+        :return: dictionary with the cursor, first and last cycle, the bots, the active bot indices and the pruned bots
+        """
+        with open(self.state_path, "rb") as file:
+            saved = pickle.load(file)
+        state = pickle.loads(saved['state'])
+
+        # Read the history rows of the ledger, rows written after the last complete checkpoint are dropped
+        histories = [[bot.hist_trade] for bot in state['bots']]
+        with open(self.ledger_path, "rb") as file:
+            while file.tell() < saved['ledger_size']:
+                i, delta = pickle.load(file)
+                histories[i].append(delta)
+
+        # The empty history only keeps the columns for bots that did not trade yet
+        for bot, frames in zip(state['bots'], histories):
+            bot.hist_trade = pd.concat(frames[1:]) if len(frames) > 1 else frames[0]
+
+        # Continue writing the ledger after the last complete checkpoint
+        with open(self.ledger_path, "ab") as file:
+            file.truncate(saved['ledger_size'])
+        self.ledger_size = saved['ledger_size']
+        self.saved_rows = state['saved_rows']
+
+        return state
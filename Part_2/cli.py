@@ -0,0 +1,246 @@
+"""
+Command line interface for headless runs, configured with a TOML file, e.g.:
+    python cli.py backtest --config config.toml --set backtest.stock_ticker='"MSFT"'
+Every feature only imports its libraries when it is used, so short jobs start fast.
+"""
+import argparse
+import datetime
+import os
+import sys
+import tomllib
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Default settings of every command, a config file or --set only has to give what is different
+DEFAULTS = {
+    'backtest': {
+        'bot_amount': 15,  # Amount of bots, a bot of each type is added until the amount is reached
+        'stock_ticker': "ASML",  # Stock ticker, or a number for the first x stocks from the S&P500
+        'start_cash': 100000,
+        'start_date': datetime.date(2022, 10, 31),
+        'end_date': datetime.date(2023, 10, 31),
+        'interval': "1d",
+        'compact': False,  # Keep the prices in a compact float32 store (for large universes)
+        'rank_by': "sharpe",
+        'top_k': 10,
+        'prune': False,  # Drop the worst half of the bots at 25%, 50% and 75% of the run
+        'checkpoint': "",  # Folder to save checkpoints in, empty to turn off
+        'checkpoint_every': 100,
+        'resume': False,  # Continue from the checkpoint in the checkpoint folder
+        'export': "",  # Folder to stream the bot histories to as Parquet files, empty to turn off
+        'drain': False,
+        'costs': {},  # Transaction costs, e.g. {bps = 5, spread = 0.001}, see costs.CostModel
+        'plot': False,
+    },
+    'sweep': {
+        'method': "evolutionary",  # 'evolutionary' search or 'walk_forward' optimization
+        'bot': "BotRSI",
+        'stock_ticker': "ASML",
+        'start_cash': 100000,
+        'start_date': datetime.date(2022, 10, 31),
+        'end_date': datetime.date(2023, 10, 31),
+        'interval': "1d",
+        'metric': "sharpe",
+        'workers': 1,
+        'population': 12,  # Evolutionary search
+        'generations': 5,
+        'seed': 0,
+        'train': 120,  # Walk-forward optimization, in cycles
+        'test': 40,
+        'step': 0,  # 0 moves the windows forward by test cycles
+        'costs': {},  # Transaction costs every candidate pays, like in backtest
+    },
+    'price-options': {
+        'S0': 100.0,  # Stock price
+        'K': 105.0,  # Strike price
+        'v': 0.1,  # Volatility
+        'T': 1.0,  # Time horizon
+        'r': 0.05,  # Risk-free rate
+        'n': 10,  # Number of time steps
+        'call_put': "Call",  # 'Call' or 'Put'
+        'exercise_policy': "European",  # 'European' or 'American'
+        'market_price': 0.0,  # Market price of the option to find the implied volatility of, 0 to skip
+    },
+    'capm': {
+        'index_symbol': "^GSPC",
+        'stock_symbols': ["MSFT"],
+        'start_date': datetime.date(2018, 10, 31),
+        'end_date': datetime.date(2023, 10, 31),
+        'interval': "1mo",
+        'plot': False,
+    },
+}
+
+
+def load_config(path=None, overrides=()):
+    """
+    Loads the settings of all commands: the defaults, updated with a TOML file and with command line overrides
+    :param path: path of a TOML file with a table per command, e.g. [backtest], None for only the defaults
+    :param overrides: list of 'command.key=value' strings, the value is written in TOML, e.g. sweep.bot="BotDHL"
+    :return: dictionary of command -> dictionary of settings
+    """
+    config = {command: dict(settings) for command, settings in DEFAULTS.items()}
+
+    if path is not None:
+        with open(path, "rb") as file:
+            for command, settings in tomllib.load(file).items():
+                config.setdefault(command, dict()).update(settings)
+
+    for override in overrides:
+        key, value = override.split("=", 1)
+        command, key = key.rsplit(".", 1)
+        config.setdefault(command, dict())[key] = tomllib.loads("value = " + value)["value"]
+
+    return config
+
+
+def bot_classes():
+    """Returns the bot classes by name"""
+    from bot_rsi import BotRSI
+    from bot_dhl import BotDHL
+    from bot_movavg import BotMovingAverage
+
+    return {'BotRSI': BotRSI, 'BotDHL': BotDHL, 'BotMovingAverage': BotMovingAverage}
+
+
+def cost_model(settings: dict):
+    """Creates the CostModel of the costs setting, None if there are no costs"""
+    if not settings.get('costs'):
+        return None
+
+    from costs import CostModel
+    return CostModel(**settings['costs'])
+
+
+def backtest(settings: dict):
+    """Runs the bots of a Trainer over the data and prints the best ones"""
+    from trainer import Trainer
+
+    # Drained histories are not in memory anymore when a checkpoint is written
+    if settings['checkpoint'] and settings['export'] and settings['drain']:
+        raise ValueError("checkpoint cannot be combined with export and drain = true")
+
+    costs = cost_model(settings)
+    trainer = Trainer(settings['bot_amount'], settings['stock_ticker'], settings['start_cash'],
+                      settings['start_date'], settings['end_date'], settings['interval'], settings['compact'], costs)
+
+    pruner = None
+    if settings['prune']:
+        from pruning import SuccessiveHalving
+        pruner = SuccessiveHalving()
+
+    checkpoint = None
+    if settings['checkpoint']:
+        from checkpoint import Checkpoint
+        checkpoint = Checkpoint(settings['checkpoint'], settings['checkpoint_every'])
+
+    exporter = None
+    if settings['export']:
+        from export import LedgerExporter
+        exporter = LedgerExporter(settings['export'], drain=settings['drain'])
+
+    if settings['resume'] and checkpoint is not None and checkpoint.exists():
+        return trainer.resume(checkpoint, settings['rank_by'], settings['top_k'], pruner, settings['plot'])
+
+    return trainer.simulate(settings['rank_by'], settings['top_k'], pruner, checkpoint, exporter, settings['plot'])
+
+
+def sweep(settings: dict):
+    """Searches the best parameters of one bot strategy and prints them"""
+    from simulator import Simulator
+
+    # Every candidate pays the costs on its own fills, so high-turnover parameters do not look better than they are
+    bot_class = bot_classes()[settings['bot']]
+    sim = Simulator([], settings['stock_ticker'], settings['start_date'], settings['end_date'], settings['interval'],
+                    costs=cost_model(settings))
+
+    if settings['method'] == "walk_forward":
+        from walk_forward import WalkForward
+        walk_forward = WalkForward(sim, bot_class, settings['start_cash'], settings['train'], settings['test'],
+                                   settings['step'] or None, metric=settings['metric'], workers=settings['workers'])
+        results = walk_forward.run()
+        print("Walk-forward folds: \n", results)
+        print("Out-of-sample total return:", walk_forward.out_of_sample_return(results))
+
+    elif settings['method'] == "evolutionary":
+        from search import EvolutionarySearch
+        search = EvolutionarySearch(sim, bot_class, settings['start_cash'], population=settings['population'],
+                                    generations=settings['generations'], metric=settings['metric'],
+                                    workers=settings['workers'], seed=settings['seed'])
+        results = search.run()
+        print("Best parameters:", search.best_params)
+        print(results.head(10))
+
+    else:
+        raise ValueError("Unknown sweep method: " + str(settings['method']))
+
+    return results
+
+
+def price_options(settings: dict):
+    """Prices an option with the binomial lattice and Black-Scholes, and finds the implied volatility"""
+    sys.path.append(os.path.join(ROOT, "Topic_2"))
+    from option_pricing import binomial_lattice, black_scholes, compute_implied_volatility
+
+    S0, K, v, T, r, n = (settings[key] for key in ('S0', 'K', 'v', 'T', 'r', 'n'))
+    call_put, exercise_policy = settings['call_put'], settings['exercise_policy']
+
+    binomial_price, _, _ = binomial_lattice(S0, K, r, v, T, n, call_put, exercise_policy)
+    print('Binomial lattice price: %.2f' % binomial_price)
+
+    # The Black-Scholes formula is only implemented for calls
+    if call_put == 'Call':
+        print('Black-Scholes price: %.2f' % black_scholes(S0, K, v, T, r))
+
+    if settings['market_price']:
+        implied_vol = compute_implied_volatility(settings['market_price'], S0, K, r, T, n, call_put, exercise_policy)
+        print('Implied volatility: %.2f%%' % (implied_vol * 100))
+
+    return binomial_price
+
+
+def capm(settings: dict):
+    """Calculates the CAPM beta of the stocks compared to the index"""
+    sys.path.append(ROOT)
+    sys.path.append(os.path.join(ROOT, "Topic_1"))
+    from market_data import get_prices
+    from capm_tool import capm_batch, plot_capm
+
+    tickers = [settings['index_symbol']] + list(settings['stock_symbols'])
+    prices = get_prices(tickers, settings['start_date'], settings['end_date'], settings['interval'])
+
+    # Change the prices to returns (in percentages) and fit all stocks at once
+    returns = (prices.pct_change() * 100).iloc[1:]
+    result = capm_batch(returns)
+    print("CAPM compared to", settings['index_symbol'], ": \n", result)
+
+    if settings['plot']:
+        plot_capm(returns, result)
+
+    return result
+
+
+COMMANDS = {'backtest': backtest, 'sweep': sweep, 'price-options': price_options, 'capm': capm}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless runs of the trading bots and finance tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for command, function in COMMANDS.items():
+        subparser = subparsers.add_parser(command, help=function.__doc__)
+        subparser.add_argument('--config', help="TOML file with a [" + command + "] table of settings")
+        subparser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                               help="override a setting, e.g. " + command + ".interval='\"1h\"'")
+
+    args = parser.parse_args(argv)
+
+    # Settings without a command prefix belong to the chosen command
+    overrides = [override if "." in override.split("=", 1)[0] else args.command + "." + override
+                 for override in args.set]
+    config = load_config(args.config, overrides)
+
+    return COMMANDS[args.command](config[args.command])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class CostModel:
+    def __init__(self, fixed=0.0, bps=0.0, spread=0.0, slippage_bps=0.0, impact=0.0):
+        """
+        Creates a model of the transaction costs and slippage of a fill
+        :param fixed: fixed fee in cash per fill
+        :param bps: commission in basis points of the traded amount of money
+        :param spread: bid-ask spread as fraction of the price, half of it is paid on every fill
+        :param slippage_bps: slippage in basis points of the price on every fill
+        :param impact: extra slippage (fraction of the price) per traded fraction of the volume, only when it is known
+        """
+        self.fixed = fixed
+        self.bps = bps
+        self.spread = spread
+        self.slippage_bps = slippage_bps
+        self.impact = impact
+
+    def slippage(self, shares=0, volume=None):
+        """Fraction of the price a fill moves against the trader: half the spread, slippage and volume impact"""
+        slippage = self.spread / 2 + self.slippage_bps / 10000
+        if volume:
+            slippage = slippage + self.impact * shares / volume
+        return slippage
+
+    def fill_price(self, price, side, shares=0, volume=None):
+        """
+        Price at which an order is filled
+        :param price: last price of the stock
+        :param side: 1 for buying, -1 for selling
+        :param shares: amount of stocks in the order, for the volume impact
+        :param volume: traded volume of the stock in the bar, None if unknown
+        """
+        return price * (1 + side * self.slippage(shares, volume))
+
+    def fee(self, notional):
+        """Fee of a fill of notional money, nothing if nothing is traded"""
+        if notional == 0:
+            return 0.0
+        return self.fixed + notional * self.bps / 10000
+
+    def affordable(self, cash, fill_price):
+        """Largest amount of stocks that can be bought with cash, including the fee"""
+        return max(int((cash - self.fixed) / (fill_price * (1 + self.bps / 10000))), 0)
+
+    def trade_costs(self, notional, participation=None):
+        """
+        Costs of many fills at once, e.g. of all bots over the whole run
+        :param notional: array with the traded amount of money per fill (0 where nothing is traded)
+        :param participation: optional array with the traded fraction of the volume per fill
+        :return: array with the costs of every fill, in the same shape as notional
+        """
+        notional = np.abs(np.asarray(notional, dtype='float64'))
+        rate = self.bps / 10000 + self.spread / 2 + self.slippage_bps / 10000
+        if participation is not None:
+            rate = rate + self.impact * np.asarray(participation, dtype='float64')
+
+        return np.where(notional > 0, notional * rate + self.fixed, 0.0)
+
+    def net_values(self, values, traded, participation=None):
+        """
+        Subtracts the costs of all fills from the values of bots that were simulated without costs
+        :param values: matrix (time x bots) with the value of every bot over time
+        :param traded: matrix (time x bots) with the traded amount of money per time step
+        :param participation: optional matrix with the traded fraction of the volume per time step
+        :return: matrix with the values after the costs paid so far
+        """
+        return values - np.cumsum(self.trade_costs(traded, participation), axis=0)
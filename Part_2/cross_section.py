@@ -0,0 +1,124 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from simulator import Simulator
+from price_store import PriceStore
+from metrics import compute_bot_metrics
+from search import PARAMETER_SPACES
+from walk_forward import parameter_grid
+
+
+def default_strategies(points=5):
+    """Every bot strategy with a grid of its parameters, as dictionary of bot class -> list of parameter dictionaries"""
+    return {bot_class: parameter_grid(space, points) for bot_class, space in PARAMETER_SPACES.items()}
+
+
+def _run_shard(directory, tickers: list, strategies: dict, start_cash, interval, history, costs=None):
+    """
+    Runs every strategy on every ticker of a shard, reading the prices from the memory-mapped store
+    :return: list with one dictionary of results per (ticker, strategy, parameters)
+    """
+    store = PriceStore.load(directory)
+    results = list()
+
+    for ticker in tickers:
+        column = store.columns[ticker]
+        first, last = int(store.first_valid[column]), int(store.last_valid[column])
+
+        # Skip tickers without enough prices, e.g. stocks that were listed at the end of the period
+        if first < 0 or last - first + 1 <= history:
+            continue
+
+        # Only this ticker is copied out of the shared store, as float64 like in a normal simulation
+        prices = pd.DataFrame({ticker: np.asarray(store.column(ticker, first, last + 1), dtype='float64')},
+                              index=store.dates(first, last + 1))
+        prices[ticker] = prices[ticker].ffill()
+
+        # All strategies of a ticker run as one batch, so they share the indicator registry
+        bots = list()
+        keys = list()
+        for bot_class, candidates in strategies.items():
+            for params in candidates:
+                bots.append(bot_class(start_cash, **params))
+                keys.append((bot_class.__name__, params))
+
+        sim = Simulator(bots, ticker, prices.index[0], prices.index[-1], interval, stock_data=prices)
+        sim.history = history
+        sim.simulate(plot=False)
+
+        # The costs of all fills of all bots are subtracted at once, the bots themselves trade without costs
+        metrics = compute_bot_metrics(bots, sim.stock_data, interval, costs=costs)
+        for (strategy, params), row in zip(keys, metrics.itertuples(index=False)):
+            result = {'ticker': ticker, 'strategy': strategy}
+            result.update(params)
+            result.update(row._asdict())
+            results.append(result)
+
+    return results
+
+
+def cross_sectional_simulation(stock_ticker, start_date, end_date, interval, start_cash=100000, strategies=None,
+                               workers=None, directory=None, history=15, costs=None):
+    """
+    Runs every bot strategy independently on every ticker of a universe, spread over a pool of processes
+    :param stock_ticker: integer amount of stocks from the S&P500, or a list of tickers
+    :param start_date: date to start the simulation from
+    :param end_date: date to stop the simulation
+    :param interval: interval between simulation data points
+    :param start_cash: amount of cash every bot starts with
+    :param strategies: dictionary of bot class -> list of parameter dictionaries, a grid of every strategy by default
+    :param workers: integer amount of processes, by default the amount of CPUs
+    :param directory: folder of the memory-mapped price store, by default in the market data cache
+    :param history: integer amount of rows the bots get in the first cycle
+    :param costs: optional CostModel, its costs are subtracted from the values of the bots before the metrics
+    :return: results cube as dataframe with a (ticker, strategy, parameters) index and the metrics as columns
+    """
+    strategies = strategies if strategies is not None else default_strategies()
+    workers = workers or os.cpu_count()
+
+    # Get the prices once and save them as a store every process memory-maps, instead of each process loading them
+    sim = Simulator([], stock_ticker, start_date, end_date, interval, compact=True)
+    if directory is None:
+        from market_data import CACHE_DIR
+        # Every universe gets its own store, keyed on its tickers, so runs on other universes never share files
+        universe = hashlib.sha1(",".join(sorted(sim.store.tickers)).encode()).hexdigest()[:16]
+        name = "_".join(["store", universe, str(start_date), str(end_date), interval])
+        directory = os.path.join(CACHE_DIR, name)
+    sim.store.save(directory)
+
+    # Several shards per process, so processes with fast tickers pick up more work
+    tickers = sim.store.tickers
+    shards = [list(shard) for shard in np.array_split(tickers, min(len(tickers), workers * 4)) if len(shard)]
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_run_shard, directory, shard, strategies, start_cash, interval, history, costs)
+                   for shard in shards]
+        results = [result for future in futures for result in future.result()]
+
+    parameters = sorted({key for candidates in strategies.values() for params in candidates for key in params})
+    return pd.DataFrame(results).set_index(['ticker', 'strategy'] + parameters).sort_index()
+
+
+def results_cube(results: pd.DataFrame, metric='sharpe'):
+    """
+    Turns the results of a cross-sectional simulation into a numpy cube of one metric
+    :param results: dataframe as returned by cross_sectional_simulation
+    :param metric: metric to put in the cube, e.g. sharpe or total_return
+    :return: array (tickers x strategies x parameters) with NaN where there is no result, and the labels of each axis
+    """
+    series = results[metric]
+    tickers = series.index.get_level_values('ticker').unique()
+    strategies = series.index.get_level_values('strategy').unique()
+
+    # All parameter levels together form the third axis
+    parameters = series.index.droplevel(['ticker', 'strategy']).unique().sort_values()
+    full = pd.MultiIndex.from_tuples([(ticker, strategy) + (params if isinstance(params, tuple) else (params,))
+                                      for ticker in tickers for strategy in strategies for params in parameters],
+                                     names=series.index.names)
+    cube = series.reindex(full).to_numpy().reshape(len(tickers), len(strategies), len(parameters))
+
+    return cube, list(tickers), list(strategies), list(parameters)
@@ -0,0 +1,231 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from metrics import bot_names, compute_metrics, PERIODS_PER_YEAR
+
+
+def _pyarrow():
+    """Imports pyarrow when results are exported or loaded, the simulator itself runs without it"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Exporting results needs pyarrow, install it with 'pip install pyarrow'")
+    return pyarrow, pyarrow.parquet
+
+
+class LedgerExporter:
+    def __init__(self, directory, every=100, batch_rows=50000, drain=False):
+        """
+        Creates an exporter that streams the history of all bots to Parquet files during a simulation
+        :param directory: folder the Parquet files and the manifest are written to
+        :param every: integer amount of cycles between two flushes of the bot histories
+        :param batch_rows: integer amount of rows collected before they are written as one row group
+        :param drain: empty the history of the bots after every flush, so memory stays flat during long runs
+                      (cannot be combined with a checkpoint, the drained rows would be missing from it)
+                      (the results are then only on disk, so don't combine it with a Checkpoint or the plots)
+        """
+        _pyarrow()
+
+        self.directory = directory
+        self.every = every
+        self.batch_rows = batch_rows
+        self.drain = drain
+
+        self.equity_path = os.path.join(directory, "equity.parquet")
+        self.ledger_path = os.path.join(directory, "ledger.parquet")
+        self.manifest_path = os.path.join(directory, "manifest.json")
+
+        self.bots = list()
+        self.stock_data = None
+        self.exported_rows = list()  # Amount of history rows of every bot that is already exported
+        self.equity = list()  # Collected equity rows per bot that are not written yet
+        self.ledger = list()  # Collected trades per bot that are not written yet
+        self.writers = dict()
+        self.rows = {'equity': 0, 'ledger': 0}
+        self.row_groups = {'equity': 0, 'ledger': 0}
+
+    def start(self, bots: list, stock_data: pd.DataFrame, interval):
+        """
+        Opens the files for a run and writes the manifest with the parameters of every bot
+        :param bots: list of all bots in the simulation
+        :param stock_data: matrix of all historical values the simulation runs on
+        :param interval: interval between the time steps of the simulation
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.bots = bots
+        self.stock_data = stock_data
+        self.exported_rows = [0] * len(bots)
+
+        # Fixed schemas, so every row group of a file has the same column types
+        pa, pq = _pyarrow()
+        date_type = pa.timestamp('ns', tz=str(stock_data.index.tz) if stock_data.index.tz is not None else None)
+        self.schemas = {
+            'equity': pa.schema([('bot', pa.int32()), ('Date', date_type), ('cash', pa.float64()),
+                                 ('value', pa.float64()), ('var', pa.float64())]),
+            'ledger': pa.schema([('bot', pa.int32()), ('Date', date_type), ('ticker', pa.string()),
+                                 ('amount', pa.float64()), ('price', pa.float64())]),
+        }
+        self.writers = {'equity': pq.ParquetWriter(self.equity_path, self.schemas['equity']),
+                        'ledger': pq.ParquetWriter(self.ledger_path, self.schemas['ledger'])}
+
+        # The manifest links the bot number in the files to the bot and its parameters
+        self.manifest = {
+            'interval': interval,
+            'tickers': stock_data.columns.tolist(),
+            'start': str(stock_data.index[0]),
+            'end': str(stock_data.index[-1]),
+            'files': {'equity': os.path.basename(self.equity_path), 'ledger': os.path.basename(self.ledger_path)},
+            'bots': [{'bot': i, 'name': name, 'class': bot.__class__.__name__,
+                      'params': {'window_size': bot.alfa}, 'start_cash': bot.value}
+                     for i, (bot, name) in enumerate(zip(bots, bot_names(bots)))],
+        }
+        self.write_manifest()
+
+    def due(self, cycle: int):
+        """Returns True if the histories have to be flushed after this integer amount of simulated cycles"""
+        return cycle % self.every == 0
+
+    def flush(self):
+        """Collects the history rows added since the last flush and writes them once there are batch_rows of them"""
+        ticker = self.stock_data.columns[0]
+
+        for i, bot in enumerate(self.bots):
+            # Only the new rows are turned into a dataframe, not the whole history
+            if bot.row_count == self.exported_rows[i]:
+                continue
+            new_rows = bot.history_since(self.exported_rows[i])
+
+            # Equity curve: cash, value and decision variable of every time step
+            self.equity.append(pd.DataFrame({
+                'bot': np.full(len(new_rows.index), i, dtype='int32'),
+                'Date': new_rows.index,
+                'cash': new_rows['cash'].to_numpy(dtype='float64'),
+                'value': new_rows['value'].to_numpy(dtype='float64'),
+                'var': pd.to_numeric(new_rows['var'], errors='coerce').to_numpy(dtype='float64'),
+            }))
+
+            # Ledger: only the time steps in which stocks were bought or sold
+            amounts = new_rows[ticker].to_numpy(dtype='float64')
+            traded = np.flatnonzero(amounts)
+            if len(traded):
+                dates = new_rows.index[traded]
+                self.ledger.append(pd.DataFrame({
+                    'bot': np.full(len(traded), i, dtype='int32'),
+                    'Date': dates,
+                    'ticker': ticker,
+                    'amount': amounts[traded],
+                    'price': self.stock_data[ticker].reindex(dates).to_numpy(dtype='float64'),
+                }))
+
+            # A drained bot only keeps the columns of its history
+            if self.drain:
+                bot.hist_trade = new_rows.iloc[:0]
+                self.exported_rows[i] = 0
+            else:
+                self.exported_rows[i] = bot.row_count
+
+        if sum(map(len, self.equity)) >= self.batch_rows:
+            self.write_batch()
+
+    def write_batch(self):
+        """Writes the collected rows as one row group in each file"""
+        pa, _ = _pyarrow()
+        for kind, frames in (('equity', self.equity), ('ledger', self.ledger)):
+            if not frames:
+                continue
+            table = pa.Table.from_pandas(pd.concat(frames, ignore_index=True), schema=self.schemas[kind],
+                                         preserve_index=False)
+            self.writers[kind].write_table(table)
+            self.rows[kind] = self.rows[kind] + table.num_rows
+            self.row_groups[kind] = self.row_groups[kind] + 1
+
+        self.equity = list()
+        self.ledger = list()
+
+    def close(self):
+        """Writes the remaining rows, closes the files and completes the manifest"""
+        self.flush()
+        self.write_batch()
+        for writer in self.writers.values():
+            writer.close()
+
+        self.manifest['rows'] = self.rows
+        self.manifest['row_groups'] = self.row_groups
+        self.write_manifest()
+
+    def write_manifest(self):
+        """Writes the manifest to a temporary file first, so there is never a half written manifest"""
+        with open(self.manifest_path + ".tmp", "w") as file:
+            json.dump(self.manifest, file, indent=2)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+
+def load_manifest(directory):
+    """Returns the manifest of an exported run as a dataframe with one row per bot"""
+    with open(os.path.join(directory, "manifest.json")) as file:
+        manifest = json.load(file)
+
+    bots = pd.json_normalize(manifest['bots'])
+    return bots.set_index('bot')
+
+
+def load_equity(directory, columns=None, bots=None):
+    """
+    Loads the equity curves of an exported run, only reading the columns and bots that are needed
+    :param directory: folder of the exported run
+    :param columns: list of columns to read, e.g. ['value'], all columns by default
+    :param bots: list of bot numbers to read, all bots by default
+    :return: dataframe with one row per bot and time step
+    """
+    _, pq = _pyarrow()
+
+    if columns is not None:
+        columns = ['bot', 'Date'] + [column for column in columns if column not in ('bot', 'Date')]
+    filters = [('bot', 'in', list(bots))] if bots is not None else None
+
+    return pq.read_table(os.path.join(directory, "equity.parquet"), columns=columns, filters=filters).to_pandas()
+
+
+def load_ledger(directory, bots=None):
+    """Loads the trades of an exported run, optionally only of the given list of bot numbers"""
+    _, pq = _pyarrow()
+
+    filters = [('bot', 'in', list(bots))] if bots is not None else None
+    return pq.read_table(os.path.join(directory, "ledger.parquet"), filters=filters).to_pandas()
+
+
+def load_values(directory, bots=None):
+    """
+    Loads the value of every bot over time as a matrix (dates x bot names), ready for metrics.compute_metrics
+    :param directory: folder of the exported run
+    :param bots: list of bot numbers to read, all bots by default
+    """
+    names = load_manifest(directory)['name']
+    equity = load_equity(directory, ['value'], bots)
+
+    values = equity.pivot(index='Date', columns='bot', values='value').rename(columns=names)
+    values.columns.name = None
+
+    # Before its first entry a bot only held its start cash, which is exactly its first value.
+    # After its last entry (e.g. a pruned bot) it has no value, like in metrics.stack_bots
+    return values.bfill()
+
+
+def load_bot_metrics(directory, risk_free=0.0):
+    """Calculates the performance metrics of all bots of an exported run, like metrics.compute_bot_metrics"""
+    with open(os.path.join(directory, "manifest.json")) as file:
+        interval = json.load(file)['interval']
+    values = load_values(directory)
+
+    # Traded amount of money per time step, from the trades in the ledger
+    ledger = load_ledger(directory)
+    ledger['traded'] = (ledger['amount'] * ledger['price']).abs()
+    traded = ledger.pivot_table(index='Date', columns='bot', values='traded', aggfunc='sum')
+    traded = traded.rename(columns=load_manifest(directory)['name'])
+    traded = traded.reindex(index=values.index, columns=values.columns).fillna(0)
+
+    return compute_metrics(values, traded, PERIODS_PER_YEAR.get(interval, 252), risk_free)
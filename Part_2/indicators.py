@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class IndicatorRegistry:
+    def __init__(self, stock_data: pd.DataFrame):
+        """
+        Creates a registry that calculates every (indicator, ticker, window) only once for all bots
+        :param stock_data: matrix of all historical values the simulation runs on
+        """
+        self.stock_data = stock_data
+        self.indicators = dict()  # (kind, ticker, window) -> array with the indicator value for every bar
+        self.subscribers = dict()  # (kind, ticker, window) -> amount of bots using the indicator
+
+        # Functions that calculate an indicator for every bar at once
+        self.calculators = {'mov_avg': moving_average, 'rsi': rsi, 'high': rolling_high, 'low': rolling_low}
+
+    def subscribe(self, kind, ticker, window: int):
+        """
+        Registers a bot for an indicator, the indicator is calculated the first time somebody subscribes to it
+        :param kind: type of indicator ('mov_avg', 'rsi', 'high' or 'low')
+        :param ticker: name of the stock the indicator is calculated on
+        :param window: integer window size of the indicator
+        """
+        key = (kind, ticker, window)
+        if key not in self.indicators:
+            prices = self.stock_data[ticker].to_numpy(dtype='float64')
+            self.indicators[key] = self.calculators[kind](prices, window)
+        self.subscribers[key] = self.subscribers.get(key, 0) + 1
+
+    def get(self, kind, ticker, window: int, bar: int):
+        """
+        Gets the value of an indicator as seen by a bot that gets the first bar rows of the stock data
+        :param kind: type of indicator ('mov_avg', 'rsi', 'high' or 'low')
+        :param ticker: name of the stock the indicator is calculated on
+        :param window: integer window size of the indicator
+        :param bar: amount of rows the bot has seen (length of hist_data)
+        :return: value of the indicator, NaN if there is not enough data for it yet
+        """
+        key = (kind, ticker, window)
+        if key not in self.indicators:
+            self.subscribe(kind, ticker, window)
+
+        return self.indicators[key][bar - 1]
+
+
+def _window_mean(values, window: int):
+    """Mean of the last window values at every position, each window is summed on its own so zeros stay exact"""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1:] = sliding_window_view(values, window).mean(axis=1)
+    return result
+
+
+def moving_average(prices, window: int):
+    """Moving average of the last window prices, for every bar (like BotMovingAverage.mov_avg)"""
+    return _window_mean(prices, window)
+
+
+def rsi(prices, window: int):
+    """RSI over the last window price changes, for every bar (like BotRSI.calculate_rsi)"""
+    result = np.full(len(prices), np.nan)
+    changes = np.diff(prices)
+
+    # BotRSI calculates the changes on the reversed data, so its 'up' moves are the drops in price
+    change_up = np.maximum(-changes, 0)
+    change_down = np.maximum(changes, 0)
+
+    # While there are fewer than window changes, BotRSI averages all available changes
+    counts = np.arange(1, len(changes) + 1)
+    avg_up = np.cumsum(change_up) / counts
+    avg_down = np.cumsum(change_down) / counts
+    if len(changes) >= window:
+        avg_up[window - 1:] = _window_mean(change_up, window)[window - 1:]
+        avg_down[window - 1:] = _window_mean(change_down, window)[window - 1:]
+
+    # Calculate the RSI, the value for a bar uses the changes up to and including that bar
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[1:] = 100 - 100 / (1 + (avg_up / avg_down))
+    return result
+
+
+def rolling_high(prices, window: int):
+    """Highest price of the window bars before the current bar, for every bar (like BotDHL.dhl)"""
+    result = np.full(len(prices), np.nan)
+    result[1:] = pd.Series(prices[:-1]).rolling(window, min_periods=1).max().to_numpy()
+    return result
+
+
+def rolling_low(prices, window: int):
+    """Lowest price of the window bars before the current bar, for every bar (like BotDHL.dhl)"""
+    result = np.full(len(prices), np.nan)
+    result[1:] = pd.Series(prices[:-1]).rolling(window, min_periods=1).min().to_numpy()
+    return result
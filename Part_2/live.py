@@ -0,0 +1,248 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from bot import BotTemplate
+from metrics import bot_names
+
+
+def parse_bar(line):
+    """
+    Parses one bar of a live feed, a JSON line like {"Date": "2023-10-31 15:59", "ASML": 612.3, "^GSPC": 4193.8}
+    :return: tuple of the timestamp and a dictionary of ticker -> price, None for an empty line
+    """
+    line = line.strip()
+    if not line:
+        return None
+
+    bar = json.loads(line)
+    date = pd.Timestamp(bar.pop("Date"))
+    return date, bar
+
+
+class FileFeed:
+    def __init__(self, path, poll=0.05, idle_timeout=None, from_start=True):
+        """
+        Creates a feed that follows a file in which bars are appended as JSON lines (like tail -f)
+        :param path: path of the file with the bars
+        :param poll: seconds between two checks for new lines
+        :param idle_timeout: seconds without a new bar after which the feed stops, None to follow the file forever
+        :param from_start: also give the bars that are already in the file, otherwise only the new ones
+        """
+        self.path = path
+        self.poll = poll
+        self.idle_timeout = idle_timeout
+        self.from_start = from_start
+
+    async def __aiter__(self):
+        """Yields (timestamp, prices, time of arrival) for every new bar"""
+        with open(self.path, "r") as file:
+            if not self.from_start:
+                file.seek(0, os.SEEK_END)
+
+            buffer = ""
+            last_bar = time.perf_counter()
+            while True:
+                chunk = file.readline()
+
+                # Wait for the rest of the line if the writer did not finish it yet
+                if chunk:
+                    buffer = buffer + chunk
+                    if not buffer.endswith("\n"):
+                        continue
+
+                    arrival = time.perf_counter()
+                    bar = parse_bar(buffer)
+                    buffer = ""
+                    if bar is not None:
+                        last_bar = arrival
+                        yield bar[0], bar[1], arrival
+                    continue
+
+                if self.idle_timeout is not None and time.perf_counter() - last_bar > self.idle_timeout:
+                    return
+                await asyncio.sleep(self.poll)
+
+
+class SocketFeed:
+    def __init__(self, host="127.0.0.1", port=9999):
+        """
+        Creates a feed that reads bars as JSON lines from a socket, the feed stops when the sender closes it
+        :param host: host of the sender, e.g. a local publisher
+        :param port: port of the sender
+        """
+        self.host = host
+        self.port = port
+
+    async def __aiter__(self):
+        """Yields (timestamp, prices, time of arrival) for every new bar"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+
+                arrival = time.perf_counter()
+                bar = parse_bar(line.decode())
+                if bar is not None:
+                    yield bar[0], bar[1], arrival
+        finally:
+            writer.close()
+
+
+class LiveEngine:
+    def __init__(self, bot_array: list[BotTemplate], tickers: list, history: pd.DataFrame = None, deadline=1.0,
+                 min_history=15, workers=None, costs=None):
+        """
+        Creates a paper trading engine that gives every new bar of a live feed to the bots, like Simulator does
+        :param bot_array: array with bot objects, the same classes as in the simulator
+        :param tickers: list of the stock names in the bars, the bots trade the first one
+        :param history: optional dataframe with earlier bars of the tickers, so the bots can start right away
+        :param deadline: seconds the bots get to decide on a bar, a later decision is undone and the bot skips the
+                         bars that arrive while it is still busy
+        :param min_history: integer amount of bars the bots need before they start trading (like Simulator.history)
+        :param workers: integer amount of threads the bots are run on, by default chosen by Python
+        :param costs: optional CostModel with the transaction costs and slippage of every fill of the bots
+        """
+        self.bot_array = bot_array
+        self.tickers = list(tickers)
+        self.deadline = deadline
+        self.min_history = min_history
+        self.executor = ThreadPoolExecutor(workers)
+
+        # Growing buffer with all bars so far, the bots get a dataframe on top of it
+        self.values = np.empty((1024, len(self.tickers)))
+        self.dates = list()
+        if history is not None:
+            for date, row in history[self.tickers].iterrows():
+                self.add_bar(date, row.to_dict())
+
+        # Latency per bar of every bot: from the arrival of the bar until the decision of the bot
+        self.latencies = [list() for _ in self.bot_array]
+        self.missed = [0] * len(self.bot_array)  # Decisions that came after the deadline and were undone
+        self.skipped = [0] * len(self.bot_array)  # Bars a bot did not get because it was still busy
+        self.late = dict()  # Bot number -> task of a decision that missed the deadline and is still running
+
+        # The bots calculate their indicators themselves, a live feed has no data to calculate them on up front
+        for bot in self.bot_array:
+            bot.initiate(self.tickers)
+            bot.indicators = None
+            bot.costs = costs
+
+    def add_bar(self, date, prices: dict):
+        """Adds a bar to the buffer, tickers missing in the bar keep their last price"""
+        if len(self.dates) == len(self.values):
+            self.values = np.concatenate([self.values, np.empty_like(self.values)])
+
+        row = len(self.dates)
+        previous = self.values[row - 1] if row > 0 else np.full(len(self.tickers), np.nan)
+        self.values[row] = [prices.get(ticker, previous[i]) for i, ticker in enumerate(self.tickers)]
+        self.dates.append(date)
+
+    @property
+    def stock_data(self):
+        """Dataframe with all bars so far, sharing its memory with the buffer"""
+        rows = len(self.dates)
+        return pd.DataFrame(self.values[:rows], index=pd.DatetimeIndex(self.dates, name="Date"),
+                            columns=self.tickers, copy=False)
+
+    async def on_bar(self, date, prices: dict, arrival):
+        """
+        Lets all bots trade on a new bar at the same time and measures how long they take
+        :param date: timestamp of the bar
+        :param prices: dictionary of ticker -> price
+        :param arrival: time.perf_counter() at which the bar arrived
+        """
+        self.add_bar(date, prices)
+        if len(self.dates) < self.min_history:
+            return
+
+        hist_data = self.stock_data
+        loop = asyncio.get_running_loop()
+
+        # A late decision that failed stops the engine, like it would stop the simulator
+        for task in [task for task in self.late.values() if task.done()]:
+            task.result()
+
+        async def decide(i, bot):
+            state = bot.snapshot()
+            await loop.run_in_executor(self.executor, bot.trade, hist_data)
+            self.latencies[i].append(time.perf_counter() - arrival)
+            return state
+
+        # Bots that are still deciding on an earlier bar skip this one
+        tasks = dict()
+        for i, bot in enumerate(self.bot_array):
+            if i in self.late:
+                self.skipped[i] = self.skipped[i] + 1
+            else:
+                tasks[i] = asyncio.ensure_future(decide(i, bot))
+
+        if not tasks:
+            return
+
+        # Only wait until the deadline, the next bar does not wait for slow bots
+        remaining = max(0, self.deadline - (time.perf_counter() - arrival))
+        done, pending = await asyncio.wait(tasks.values(), timeout=remaining)
+        for i, task in tasks.items():
+            if task in pending:
+                self.missed[i] = self.missed[i] + 1
+                self.late[i] = task
+                task.add_done_callback(lambda task, i=i: self.undo(i, task))
+
+        # A bot that failed on this bar stops the engine, like it would stop the simulator
+        for task in done:
+            task.result()
+
+    def undo(self, i, task):
+        """Undoes the decision of a bot that came after the deadline, as if the bot skipped that bar"""
+        del self.late[i]
+        if not task.cancelled() and task.exception() is None:
+            self.bot_array[i].restore(task.result())
+        else:
+            # Keep a failed task, so the next bar raises its error
+            self.late[i] = task
+
+    async def run(self, feed):
+        """
+        Trades on every bar of the feed until it stops
+        :param feed: FileFeed, SocketFeed or any async iterable of (timestamp, prices, time of arrival)
+        """
+        try:
+            async for date, prices, arrival in feed:
+                await self.on_bar(date, prices, arrival)
+        finally:
+            # Let the late decisions finish, so they are undone before the bots are used
+            running = [task for task in self.late.values() if not task.done()]
+            if running:
+                await asyncio.wait(running)
+            self.executor.shutdown()
+
+        for task in self.late.values():
+            task.result()
+
+    def latency_report(self, percentiles=(50, 90, 99)):
+        """Returns a dataframe with the tick-to-decision latency percentiles (ms), missed deadlines and skipped bars"""
+        report = pd.DataFrame(index=bot_names(self.bot_array))
+        for percentile in percentiles:
+            report['p' + str(percentile)] = [np.percentile(latency, percentile) * 1000 if latency else np.nan
+                                             for latency in self.latencies]
+        report['max'] = [max(latency) * 1000 if latency else np.nan for latency in self.latencies]
+        report['bars'] = [len(latency) for latency in self.latencies]
+        report['missed'] = self.missed
+        report['skipped'] = self.skipped
+
+        return report
+
+
+def run_live(bot_array: list[BotTemplate], tickers: list, feed, **kwargs):
+    """Runs a LiveEngine on a feed until it stops and returns the engine with the bots and latencies"""
+    engine = LiveEngine(bot_array, tickers, **kwargs)
+    asyncio.run(engine.run(feed))
+    return engine
@@ -0,0 +1,119 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Amount of time steps per year for each interval, used to annualize the metrics
+PERIODS_PER_YEAR = {"1m": 252 * 390, "2m": 252 * 195, "5m": 252 * 78, "15m": 252 * 26, "30m": 252 * 13,
+                    "60m": 252 * 7, "90m": 252 * 5, "1h": 252 * 7, "1d": 252, "5d": 52, "1wk": 52, "1mo": 12,
+                    "3mo": 4}
+
+
+def bot_names(bots: list):
+    """Gives every bot a unique name from its class and window size, e.g. 'BotRSI 8'"""
+    names = list()
+    for bot in bots:
+        name = bot.__class__.__name__ + " " + str(bot.alfa)
+        # Bots with the same class and window get a number, so no results are lost
+        if name in names:
+            name = name + " #" + str(sum(existing.startswith(name) for existing in names) + 1)
+        names.append(name)
+
+    return names
+
+
+def stack_bots(bots: list, stock_data: pd.DataFrame):
+    """
+    Stacks the value and trade history of all bots into matrices with one column per bot
+    :param bots: list of bots after a simulation
+    :param stock_data: matrix of historical values the bots traded on (first column)
+    :return: dataframes (dates x bots) with the value and with the traded amount of money per time step
+    """
+    names = bot_names(bots)
+    ticker = stock_data.columns[0]
+
+    # Before its first entry a bot only held its start cash, which is exactly its first value.
+    # After its last entry (e.g. a pruned bot) it has no value, so its metrics stop where its history stops
+    values = pd.concat([bot.hist_trade['value'] for bot in bots], axis=1, keys=names).astype('float64')
+    values = values.bfill()
+
+    # Amount of stocks traded per time step times the price is the traded amount of money
+    amounts = pd.concat([bot.hist_trade[ticker] for bot in bots], axis=1, keys=names).astype('float64')
+    prices = stock_data[ticker].reindex(amounts.index).to_numpy(dtype='float64')[:, np.newaxis]
+    traded = (amounts.fillna(0).abs() * prices).reindex(values.index).fillna(0)
+
+    return values, traded
+
+
+def compute_metrics(values, traded=None, periods_per_year=252, risk_free=0.0):
+    """
+    Calculates the performance metrics of all bots at once from their stacked value series
+    :param values: matrix (time x bots) with the value of every bot over time, NaN after the end of a shorter bot
+    :param traded: matrix (time x bots) with the traded amount of money per time step, None if unknown
+    :param periods_per_year: amount of time steps in a year, to annualize the metrics
+    :param risk_free: yearly risk free return
+    :return: dataframe with one row per bot and the metrics as columns
+    """
+    names = values.columns if isinstance(values, pd.DataFrame) else None
+    values = np.asarray(values, dtype='float64')
+
+    # Every bot is measured up to its own last value, e.g. a bot that was pruned halfway
+    has_value = ~np.isnan(values)
+    periods = has_value.sum(axis=0) - 1
+    last = values[np.where(has_value.any(axis=0), len(values) - 1 - has_value[::-1].argmax(axis=0), 0),
+                  np.arange(values.shape[1])]
+
+    # Returns per time step of every bot
+    returns = values[1:] / values[:-1] - 1
+    excess = returns - risk_free / periods_per_year
+
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        # Bots without returns get NaN metrics
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        total_return = last / values[0] - 1
+        cagr = (last / values[0]) ** (periods_per_year / periods) - 1
+        sharpe = np.nanmean(excess, axis=0) / np.nanstd(returns, axis=0, ddof=1) * np.sqrt(periods_per_year)
+        downside = np.sqrt(np.nanmean(np.minimum(excess, 0) ** 2, axis=0))
+        sortino = np.nanmean(excess, axis=0) / downside * np.sqrt(periods_per_year)
+
+        # Largest drop from a previous top
+        max_drawdown = np.nanmin(values / np.fmax.accumulate(values, axis=0) - 1, axis=0)
+
+        # Turnover: traded money per year relative to the average value
+        if traded is not None:
+            traded = np.asarray(traded, dtype='float64')
+            turnover = traded.sum(axis=0) / np.nanmean(values, axis=0) * periods_per_year / periods
+            trade_count = np.count_nonzero(traded, axis=0)
+        else:
+            turnover = np.full(values.shape[1], np.nan)
+            trade_count = np.full(values.shape[1], np.nan)
+
+    return pd.DataFrame({'total_return': total_return, 'cagr': cagr, 'sharpe': sharpe, 'sortino': sortino,
+                         'max_drawdown': max_drawdown, 'turnover': turnover, 'trade_count': trade_count},
+                        index=names)
+
+
+def compute_bot_metrics(bots: list, stock_data: pd.DataFrame, interval="1d", risk_free=0.0, costs=None):
+    """
+    Stacks the histories of the bots and calculates their performance metrics
+    :param costs: optional CostModel to subtract from bots that were simulated without costs, for all bots at once
+    """
+    values, traded = stack_bots(bots, stock_data)
+    if costs is not None:
+        values = costs.net_values(values, traded)
+    return compute_metrics(values, traded, PERIODS_PER_YEAR.get(interval, 252), risk_free)
+
+
+def rank(metrics: pd.DataFrame, by='sharpe', top_k=10, exclude=()):
+    """
+    Ranks the bots on one metric and returns the top_k best
+    :param metrics: dataframe as returned by compute_metrics
+    :param by: metric to rank on, max_drawdown is better when closer to zero so it is also sorted descending
+    :param top_k: amount of bots to return
+    :param exclude: names of bots that are not ranked, e.g. bots that were pruned and did not finish the run
+    """
+    ranked = metrics.drop(index=list(exclude)).sort_values(by, ascending=False, na_position='last')
+    ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+
+    return ranked.head(top_k)
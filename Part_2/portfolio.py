@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+
+
+def _shrunk_covariance(count, sum_x, sum_xx, sum_a2, sum_ax):
+    """
+    Calculates the Ledoit-Wolf shrunk covariance from running sums of the returns
+    :param count: amount of return rows
+    :param sum_x: sum of the return rows (vector)
+    :param sum_xx: sum of the outer products of the return rows (matrix)
+    :param sum_a2: sum of the squared squared-norms of the return rows (scalar)
+    :param sum_ax: sum of the return rows weighted by their squared norm (vector)
+    :return: shrunk covariance matrix and the shrinkage intensity
+    """
+    n_assets = len(sum_x)
+
+    # Sample covariance (maximum likelihood, so divided by count like Ledoit-Wolf do)
+    mean = sum_x / count
+    sample_cov = sum_xx / count - np.outer(mean, mean)
+
+    # Target: identity scaled by the average variance
+    mu = np.trace(sample_cov) / n_assets
+    target_distance = sample_cov.copy()
+    target_distance[np.diag_indices(n_assets)] -= mu
+    delta = (target_distance ** 2).sum() / n_assets
+
+    # Sum of the fourth powers of the demeaned norms, expanded so it only needs the running sums
+    c = mean @ mean
+    fourth_moment = sum_a2 + 4 * mean @ sum_xx @ mean + count * c ** 2 - 4 * mean @ sum_ax \
+        + 2 * c * np.trace(sum_xx) - 4 * c * (mean @ sum_x)
+
+    # Estimation error of the sample covariance, which cannot be larger than the distance to the target
+    beta = (fourth_moment - count * (sample_cov ** 2).sum()) / count ** 2 / n_assets
+    beta = min(max(beta, 0), delta)
+
+    shrinkage = beta / delta if delta > 0 else 1
+    shrunk_cov = (1 - shrinkage) * sample_cov
+    shrunk_cov[np.diag_indices(n_assets)] += shrinkage * mu
+
+    return shrunk_cov, shrinkage
+
+
+def ledoit_wolf(returns):
+    """
+    Estimates the covariance matrix of many assets with Ledoit-Wolf shrinkage towards a scaled identity
+    :param returns: matrix (time x assets) of returns without NaNs
+    :return: shrunk covariance matrix and the shrinkage intensity
+    """
+    x = np.asarray(returns, dtype='float64')
+    squared_norm = (x * x).sum(axis=1)
+
+    return _shrunk_covariance(len(x), x.sum(axis=0), x.T @ x, squared_norm @ squared_norm, x.T @ squared_norm)
+
+
+def factor_covariance(returns, index_returns):
+    """
+    Estimates the covariance matrix with a single factor model that uses the index as factor
+    :param returns: matrix (time x assets) of returns without NaNs
+    :param index_returns: array with the returns of the index for the same dates
+    :return: covariance matrix: beta * beta' * var(index) + diagonal of the residual variances
+    """
+    x = np.asarray(returns, dtype='float64')
+    m = np.asarray(index_returns, dtype='float64')
+
+    # Betas of all assets at once
+    x_demeaned = x - x.mean(axis=0)
+    m_demeaned = m - m.mean()
+    var_index = m_demeaned @ m_demeaned / len(m)
+    betas = x_demeaned.T @ m_demeaned / len(m) / var_index
+
+    # The part of the returns that the index does not explain
+    residuals = x_demeaned - np.outer(m_demeaned, betas)
+    residual_var = (residuals ** 2).mean(axis=0)
+
+    factor_cov = np.outer(betas, betas) * var_index
+    factor_cov[np.diag_indices(len(betas))] += residual_var
+
+    return factor_cov
+
+
+def min_variance_weights(cov):
+    """
+    Calculates the fully invested minimum variance portfolio (short selling allowed)
+    :param cov: covariance matrix of the assets
+    :return: array with the weight of each asset, summing to 1
+    """
+    inv_ones = np.linalg.solve(cov, np.ones(len(cov)))
+
+    return inv_ones / inv_ones.sum()
+
+
+def max_sharpe_weights(cov, expected_returns, risk_free=0.0):
+    """
+    Calculates the fully invested tangency (maximum Sharpe ratio) portfolio (short selling allowed)
+    :param cov: covariance matrix of the assets
+    :param expected_returns: array with the expected return per time step of each asset
+    :param risk_free: risk free return per time step
+    :return: array with the weight of each asset, summing to 1
+    """
+    inv_excess = np.linalg.solve(cov, np.asarray(expected_returns, dtype='float64') - risk_free)
+
+    return inv_excess / inv_excess.sum()
+
+
+class RollingCovariance:
+    def __init__(self, n_assets: int, window: int):
+        """
+        Keeps the running sums needed for the Ledoit-Wolf estimate over a rolling window of returns
+        :param n_assets: integer amount of assets
+        :param window: integer amount of return rows in the window
+        """
+        self.window = window
+        self.rows = list()  # The return rows currently in the window, oldest first
+
+        # Running sums, updated with rank-1 updates when rows enter or leave the window
+        self.sum_x = np.zeros(n_assets)
+        self.sum_xx = np.zeros((n_assets, n_assets))
+        self.sum_a2 = 0.0
+        self.sum_ax = np.zeros(n_assets)
+
+    def update(self, returns):
+        """
+        Adds one or more return rows and removes the rows that fall out of the window
+        :param returns: array with one row (assets) or a matrix (time x assets) of new returns
+        """
+        new_rows = np.atleast_2d(np.asarray(returns, dtype='float64'))
+        self._add(new_rows, 1)
+        self.rows.extend(new_rows)
+
+        # Remove the oldest rows in one block
+        excess = len(self.rows) - self.window
+        if excess > 0:
+            self._add(np.array(self.rows[:excess]), -1)
+            del self.rows[:excess]
+
+    def _add(self, x, sign):
+        """Adds (sign 1) or removes (sign -1) a block of rows from the running sums"""
+        squared_norm = (x * x).sum(axis=1)
+        self.sum_x += sign * x.sum(axis=0)
+        self.sum_xx += sign * (x.T @ x)
+        self.sum_a2 += sign * (squared_norm @ squared_norm)
+        self.sum_ax += sign * (x.T @ squared_norm)
+
+    def covariance(self):
+        """Returns the Ledoit-Wolf shrunk covariance and shrinkage intensity of the current window"""
+        return _shrunk_covariance(len(self.rows), self.sum_x, self.sum_xx, self.sum_a2, self.sum_ax)
+
+    def mean(self):
+        """Returns the mean return of every asset in the current window"""
+        return self.sum_x / len(self.rows)
+
+
+def optimize_portfolio(prices: pd.DataFrame, method="min_variance", estimator="ledoit_wolf",
+                       index_column="^GSPC", risk_free=0.0):
+    """
+    Calculates portfolio weights for all stocks in a price dataframe
+    :param prices: dataframe with the prices of the stocks (and the index if the factor estimator is used)
+    :param method: "min_variance" or "max_sharpe"
+    :param estimator: "ledoit_wolf", "factor" or "sample" covariance estimator
+    :param index_column: name of the index column, which is never part of the portfolio
+    :param risk_free: risk free return per time step, used by max_sharpe
+    :return: series with the weight of each stock
+    """
+    returns = prices.pct_change().dropna()
+    tickers = [column for column in returns.columns if column != index_column]
+    stock_returns = returns[tickers].to_numpy()
+
+    # Estimate the covariance matrix
+    if estimator == "ledoit_wolf":
+        cov, _ = ledoit_wolf(stock_returns)
+    elif estimator == "factor":
+        cov = factor_covariance(stock_returns, returns[index_column].to_numpy())
+    elif estimator == "sample":
+        cov = np.cov(stock_returns, rowvar=False, bias=True)
+    else:
+        raise ValueError("Unknown covariance estimator: " + str(estimator))
+
+    # Solve for the weights
+    if method == "min_variance":
+        weights = min_variance_weights(cov)
+    elif method == "max_sharpe":
+        weights = max_sharpe_weights(cov, stock_returns.mean(axis=0), risk_free)
+    else:
+        raise ValueError("Unknown optimization method: " + str(method))
+
+    return pd.Series(weights, index=tickers)
+
+
+def rolling_rebalance(prices: pd.DataFrame, window: int, step: int, method="min_variance",
+                      index_column="^GSPC", risk_free=0.0):
+    """
+    Re-estimates the Ledoit-Wolf covariance incrementally as the window rolls and rebalances every step
+    :param prices: dataframe with the prices of the stocks (the index column is ignored)
+    :param window: integer amount of returns used for each estimate
+    :param step: integer amount of time steps between rebalances
+    :param method: "min_variance" or "max_sharpe"
+    :param index_column: name of the index column, which is never part of the portfolio
+    :param risk_free: risk free return per time step, used by max_sharpe
+    :return: dataframe with the weights (columns) at each rebalance date (index)
+    """
+    if method not in ("min_variance", "max_sharpe"):
+        raise ValueError("Unknown optimization method: " + str(method))
+
+    returns = prices.drop(columns=index_column, errors='ignore').pct_change().dropna()
+    values = returns.to_numpy()
+    rolling_cov = RollingCovariance(values.shape[1], window)
+
+    # Fill the first window at once, after that only the new rows of each step are added
+    rolling_cov.update(values[:window])
+    weights = list()
+    dates = list()
+    for end in range(window, len(values) + 1, step):
+        if end > window:
+            rolling_cov.update(values[end - step:end])
+
+        cov, _ = rolling_cov.covariance()
+        if method == "min_variance":
+            weights.append(min_variance_weights(cov))
+        else:
+            weights.append(max_sharpe_weights(cov, rolling_cov.mean(), risk_free))
+        dates.append(returns.index[end - 1])
+
+    return pd.DataFrame(weights, index=dates, columns=returns.columns)
@@ -0,0 +1,149 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class PriceStore:
+    def __init__(self, prices: pd.DataFrame, dtype='float32'):
+        """
+        Creates a compact store of a price dataframe: one contiguous price matrix with integer timestamps
+        :param prices: dataframe with the dates as index and one column of prices per ticker
+        :param dtype: data type of the price matrix, float32 halves the memory of the float64 dataframe
+        """
+        self._set(prices.columns.tolist(), prices.index, prices.to_numpy(dtype=dtype))
+
+    @classmethod
+    def from_columns(cls, columns, dtype='float32'):
+        """
+        Creates a store column by column, without ever holding all prices as float64 (e.g. from iter_prices)
+        :param columns: iterable of (ticker, series of prices), a series can be None or empty if there are no prices
+        :param dtype: data type of the price matrix
+        """
+        # Keep every column in dtype, most tickers have the same dates so their index is only kept once
+        tickers = list()
+        parts = list()
+        indexes = list()
+        for ticker, prices in columns:
+            tickers.append(ticker)
+            if prices is None or prices.empty:
+                parts.append(None)
+                continue
+            index = next((known for known in indexes if known.equals(prices.index)), None)
+            if index is None:
+                index = prices.index
+                indexes.append(index)
+            parts.append((index, prices.to_numpy(dtype=dtype)))
+
+        dates = indexes[0] if indexes else pd.DatetimeIndex([])
+        for index in indexes[1:]:
+            dates = dates.union(index)
+        dates = dates.sort_values()
+
+        # Put every column in its rows of one preallocated matrix, the kept column is freed right after
+        values = np.full((len(dates), len(tickers)), np.nan, dtype=dtype)
+        rows = dict()
+        for column, part in enumerate(parts):
+            if part is None:
+                continue
+            index, prices = part
+            if id(index) not in rows:
+                rows[id(index)] = dates.get_indexer(index)
+            values[rows[id(index)], column] = prices
+            parts[column] = None
+
+            # Fill the gaps with the last known price, like the prices dataframe does
+            filled = np.where(np.isnan(values[:, column]), 0, np.arange(len(dates)))
+            values[:, column] = values[np.maximum.accumulate(filled), column]
+
+        store = cls.__new__(cls)
+        store._set(tickers, dates, values)
+        return store
+
+    def _set(self, tickers, index, values):
+        """Sets the arrays of the store from the tickers, dates and price matrix"""
+        self.tickers = list(tickers)
+        self.columns = {ticker: i for i, ticker in enumerate(self.tickers)}  # Ticker -> column of the matrix
+
+        # Timestamps as int64 nanoseconds since the epoch (UTC), the timezone is kept to rebuild the dates
+        index = pd.DatetimeIndex(index)
+        self.tz = index.tz
+        self.timestamps = np.ascontiguousarray(index.as_unit("ns").asi8)
+
+        # Row-major price matrix, so a window of the last rows of all tickers is one contiguous block
+        self.values = np.ascontiguousarray(values)
+
+        # First and last row with a price of every ticker (e.g. stocks listed during the period), -1 if none
+        has_price = ~np.isnan(self.values)
+        self.first_valid = np.where(has_price.any(axis=0), has_price.argmax(axis=0), -1)
+        self.last_valid = np.where(has_price.any(axis=0), len(has_price) - 1 - has_price[::-1].argmax(axis=0), -1)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def nbytes(self):
+        """Total amount of bytes used by the arrays of the store"""
+        return self.values.nbytes + self.timestamps.nbytes + self.first_valid.nbytes + self.last_valid.nbytes
+
+    def column(self, ticker, start=0, end=None):
+        """Returns a view (no copy) of the prices of one ticker"""
+        return self.values[start:end, self.columns[ticker]]
+
+    def window(self, end, length=None):
+        """Returns a view (no copy) of the rows before end, all rows or only the last length rows"""
+        start = 0 if length is None else max(end - length, 0)
+        return self.values[start:end]
+
+    def mask(self, start=0, end=None):
+        """Returns a boolean matrix that is True where a ticker has a price, only computed for the requested rows"""
+        return ~np.isnan(self.values[start:end])
+
+    def dates(self, start=0, end=None):
+        """Returns the dates of the rows from start up to end as a DatetimeIndex"""
+        dates = pd.DatetimeIndex(self.timestamps[start:end].view('datetime64[ns]'), name="Date")
+        return dates if self.tz is None else dates.tz_localize("UTC").tz_convert(self.tz)
+
+    def frame(self, end=None, start=0):
+        """Returns the rows from start up to end as a dataframe that shares its memory with the store"""
+        return pd.DataFrame(self.values[start:end], index=self.dates(start, end), columns=self.tickers, copy=False)
+
+    def save(self, directory):
+        """
+        Saves the arrays of the store as .npy files, so other processes can memory-map them with load
+        :param directory: folder to save the store in
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        # Every file is written to a temporary file first, so processes that memory-map the store never see half
+        # written files (they keep the old file until they load the store again)
+        for name in ('values', 'timestamps', 'first_valid', 'last_valid'):
+            filename = os.path.join(directory, name + ".npy")
+            with open(filename + ".tmp", "wb") as file:
+                np.save(file, getattr(self, name))
+            os.replace(filename + ".tmp", filename)
+
+        filename = os.path.join(directory, "store.json")
+        with open(filename + ".tmp", "w") as file:
+            json.dump({'tickers': self.tickers, 'tz': str(self.tz) if self.tz is not None else None}, file)
+        os.replace(filename + ".tmp", filename)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Loads a saved store, by default memory-mapped: every process shares the same pages and nothing is copied
+        :param directory: folder the store was saved in
+        :param mmap_mode: mode of numpy.load, 'r' for read-only memory-mapping or None to read into memory
+        """
+        store = cls.__new__(cls)
+        for name in ('values', 'timestamps', 'first_valid', 'last_valid'):
+            setattr(store, name, np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode))
+
+        with open(os.path.join(directory, "store.json")) as file:
+            meta = json.load(file)
+        store.tickers = meta['tickers']
+        store.columns = {ticker: i for i, ticker in enumerate(store.tickers)}
+        store.tz = meta['tz']
+
+        return store
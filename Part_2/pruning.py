@@ -0,0 +1,59 @@
+import math
+
+import pandas as pd
+
+from metrics import bot_names
+
+
+class SuccessiveHalving:
+    def __init__(self, milestones=(0.25, 0.5, 0.75), fraction=0.5, min_bots=1):
+        """
+        Creates a pruning scheduler that drops the worst bots at each milestone of a simulation
+        :param milestones: moments to prune, as fraction of the run (float below 1) or as amount of cycles (integer)
+        :param fraction: fraction of the remaining bots that is dropped at every milestone (0.5 halves them)
+        :param min_bots: integer amount of bots that are never pruned
+        """
+        self.milestones = milestones
+        self.fraction = fraction
+        self.min_bots = min_bots
+
+        self.checkpoints = set()  # Cycles at which is pruned, known once the length of the run is known
+        self.names = dict()  # Bot -> unique name used in the report
+        self.pruned = list()  # One entry per pruned bot: name, cycle, date and value at the moment of pruning
+
+    def setup(self, bots: list, cycles: int):
+        """
+        Prepares the scheduler for a run
+        :param bots: list of all bots in the simulation
+        :param cycles: integer amount of cycles the simulation runs
+        """
+        self.names = dict(zip(map(id, bots), bot_names(bots)))
+        self.pruned = list()
+        self.checkpoints = {round(milestone * cycles) if isinstance(milestone, float) else milestone
+                            for milestone in self.milestones}
+
+    def prune(self, cycle: int, bots: list, date):
+        """
+        Drops the worst fraction of the bots if this cycle is a milestone
+        :param cycle: integer amount of cycles that have been simulated
+        :param bots: list of bots that are still active
+        :param date: date of the current cycle, saved in the report
+        :return: list of bots that stay active
+        """
+        if cycle not in self.checkpoints or len(bots) <= self.min_bots:
+            return bots
+
+        # Rank the bots on their value and keep the best ones
+        ranked = sorted(bots, key=lambda bot: bot.value, reverse=True)
+        keep = max(self.min_bots, len(bots) - math.floor(len(bots) * self.fraction))
+
+        for bot in ranked[keep:]:
+            self.pruned.append({'bot': self.names[id(bot)], 'cycle': cycle, 'date': date, 'value': bot.value})
+
+        # Keep the original order of the bots, so the simulation treats them the same as without pruning
+        kept = set(map(id, ranked[:keep]))
+        return [bot for bot in bots if id(bot) in kept]
+
+    def report(self):
+        """Returns a dataframe with which bots were pruned and when"""
+        return pd.DataFrame(self.pruned, columns=['bot', 'cycle', 'date', 'value']).set_index('bot')
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+
+class RollingBeta:
+    def __init__(self, tickers: list, window: int = None, alpha: float = None):
+        """
+        Creates an online estimator of the beta and correlation of many stocks against the index
+        :param tickers: list with the names of the stocks the beta is estimated for
+        :param window: integer amount of returns in the rolling window (windowed mode)
+        :param alpha: smoothing factor between 0 and 1 of the exponentially weighted mode, used if window is None
+        """
+        if (window is None) == (alpha is None):
+            raise ValueError("Specify either a window or an alpha")
+
+        self.tickers = list(tickers)
+        self.window = window
+        self.alpha = alpha
+
+        # Running state per stock: amount of returns, means and co-moments of the index (x) and the stock (y).
+        # A stock only counts the bars where both its return and the index return are known, so a missing price
+        # (e.g. before a stock was listed) is skipped instead of making its state NaN for the rest of the run
+        self.n = np.zeros(len(self.tickers), dtype='int64')
+        self.mean_x = np.zeros(len(self.tickers))
+        self.mean_y = np.zeros(len(self.tickers))
+        self.m_xx = np.zeros(len(self.tickers))
+        self.m_yy = np.zeros(len(self.tickers))
+        self.m_xy = np.zeros(len(self.tickers))
+
+        # Ring buffer with the returns in the window, so the oldest can be removed again
+        if self.window is not None:
+            self.buffer_x = np.full(self.window, np.nan)
+            self.buffer_y = np.full((self.window, len(self.tickers)), np.nan)
+            self.head = 0
+
+        # Last prices, used when the estimator is fed with prices instead of returns
+        self.last_index_price = None
+        self.last_stock_prices = None
+
+    def update(self, index_return, stock_returns):
+        """
+        Adds the returns of one new bar to the estimator in O(1) per stock, NaN returns are skipped
+        :param index_return: return of the index for this bar
+        :param stock_returns: array with the return of each stock for this bar (same order as tickers)
+        """
+        x = float(index_return)
+        y = np.asarray(stock_returns, dtype='float64')
+        valid = np.isfinite(y) & np.isfinite(x)
+
+        if self.window is None:
+            self._update_weighted(x, y, valid)
+            return
+
+        # The window always spans the same amount of bars, so first remove the returns of the oldest bar
+        old_x, old_y = self.buffer_x[self.head], self.buffer_y[self.head]
+        self._remove(old_x, old_y, np.isfinite(old_y) & np.isfinite(old_x))
+
+        self.buffer_x[self.head] = x
+        self.buffer_y[self.head] = y
+        self.head = (self.head + 1) % self.window
+        self._add(x, y, valid)
+
+    def update_prices(self, index_price, stock_prices):
+        """
+        Adds one new bar of prices, the returns are calculated from the previous bar
+        :param index_price: price of the index for this bar
+        :param stock_prices: array with the price of each stock for this bar (same order as tickers)
+        """
+        stock_prices = np.asarray(stock_prices, dtype='float64')
+
+        # The first bar only sets the reference prices
+        if self.last_index_price is not None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.update(index_price / self.last_index_price - 1, stock_prices / self.last_stock_prices - 1)
+
+        self.last_index_price = float(index_price)
+        self.last_stock_prices = stock_prices
+
+    def _add(self, x, y, valid):
+        """Welford update: adds one observation to the means and co-moments of the stocks where it is valid"""
+        n = self.n + valid
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dx = np.where(valid, x - self.mean_x, 0.0)
+            dy = np.where(valid, y - self.mean_y, 0.0)
+            self.mean_x = self.mean_x + np.where(valid, dx / n, 0.0)
+            self.mean_y = self.mean_y + np.where(valid, dy / n, 0.0)
+        self.m_xx = self.m_xx + dx * np.where(valid, x - self.mean_x, 0.0)
+        self.m_yy = self.m_yy + dy * np.where(valid, y - self.mean_y, 0.0)
+        self.m_xy = self.m_xy + dx * np.where(valid, y - self.mean_y, 0.0)
+        self.n = n
+
+    def _remove(self, x, y, valid):
+        """Inverse Welford update: removes one observation from the stocks where it was added"""
+        n = self.n - valid
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(valid & (n > 0), self.n / n, 0.0)
+            dx = np.where(valid, x - self.mean_x, 0.0)
+            dy = np.where(valid, y - self.mean_y, 0.0)
+            self.m_xy = self.m_xy - dx * dy * scale
+            self.m_xx = self.m_xx - dx ** 2 * scale
+            self.m_yy = self.m_yy - dy ** 2 * scale
+            self.mean_x = np.where(valid, (self.n * self.mean_x - np.where(valid, x, 0.0)) / n, self.mean_x)
+            self.mean_y = np.where(valid, (self.n * self.mean_y - np.where(valid, y, 0.0)) / n, self.mean_y)
+
+        # A stock without observations left starts again from zero
+        empty = n == 0
+        for moment in (self.mean_x, self.mean_y, self.m_xx, self.m_yy, self.m_xy):
+            moment[empty] = 0.0
+        self.n = n
+
+    def _update_weighted(self, x, y, valid):
+        """Exponentially weighted update of the means and co-moments of the stocks where the returns are valid"""
+        first = valid & (self.n == 0)
+        update = valid & (self.n > 0)
+
+        # The first return of a stock only sets its means
+        self.mean_x = np.where(first, x, self.mean_x)
+        self.mean_y = np.where(first, y, self.mean_y)
+
+        dx = np.where(update, x - self.mean_x, 0.0)
+        dy = np.where(update, y - self.mean_y, 0.0)
+        self.mean_x = np.where(update, self.mean_x + self.alpha * dx, self.mean_x)
+        self.mean_y = np.where(update, self.mean_y + self.alpha * dy, self.mean_y)
+        self.m_xx = np.where(update, (1 - self.alpha) * (self.m_xx + self.alpha * dx * dx), self.m_xx)
+        self.m_xy = np.where(update, (1 - self.alpha) * (self.m_xy + self.alpha * dx * dy), self.m_xy)
+        self.m_yy = np.where(update, (1 - self.alpha) * (self.m_yy + self.alpha * dy * dy), self.m_yy)
+        self.n = self.n + valid
+
+    @property
+    def beta(self):
+        """Current beta of every stock, NaN for stocks with less than two returns"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.n >= 2, self.m_xy / self.m_xx, np.nan)
+
+    @property
+    def correlation(self):
+        """Current correlation of every stock with the index, NaN for stocks with less than two returns"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.n >= 2, self.m_xy / np.sqrt(self.m_xx * self.m_yy), np.nan)
+
+
+def rolling_beta(prices: pd.DataFrame, index_column="^GSPC", window: int = None, alpha: float = None):
+    """
+    Runs the online estimator over historical prices (batch mode)
+    :param prices: dataframe of prices with the index and the stocks as columns
+    :param index_column: name of the index column
+    :param window: integer amount of returns in the rolling window
+    :param alpha: smoothing factor of the exponentially weighted mode, used if window is None
+    :return: dataframes with the beta and correlation of every stock for every bar
+    """
+    tickers = [column for column in prices.columns if column != index_column]
+    estimator = RollingBeta(tickers, window, alpha)
+
+    index_prices = prices[index_column].to_numpy(dtype='float64')
+    stock_prices = prices[tickers].to_numpy(dtype='float64')
+    betas = np.empty(stock_prices.shape)
+    correlations = np.empty(stock_prices.shape)
+
+    # Feed the bars one by one, exactly like they would arrive during a simulation
+    for i in range(len(prices.index)):
+        estimator.update_prices(index_prices[i], stock_prices[i])
+        betas[i] = estimator.beta
+        correlations[i] = estimator.correlation
+
+    return pd.DataFrame(betas, index=prices.index, columns=tickers), \
+        pd.DataFrame(correlations, index=prices.index, columns=tickers)
@@ -0,0 +1,137 @@
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from bot_rsi import BotRSI
+from bot_dhl import BotDHL
+from bot_movavg import BotMovingAverage
+from metrics import compute_bot_metrics
+
+# Integer range (lowest, highest) of every parameter of the bot strategies that can be searched
+PARAMETER_SPACES = {
+    BotDHL: {'window_size': (2, 60)},
+    BotRSI: {'window_size': (2, 60)},
+    BotMovingAverage: {'window_size': (2, 60)},
+}
+
+
+def _simulate_batch(simulator, bots):
+    """Runs one batch of bots through the simulator without plotting and returns them (used by the workers)"""
+    simulator.bot_array = bots
+    simulator.simulate(plot=False)
+    return bots
+
+
+class EvolutionarySearch:
+    def __init__(self, simulator, bot_class, start_cash, space: dict = None, population=12, generations=5,
+                 elite_fraction=0.25, mutation=0.15, metric='sharpe', workers=1, seed=None):
+        """
+        Creates an evolutionary search for the parameters of a bot strategy
+        :param simulator: Simulator with the price data, reused for every evaluation
+        :param bot_class: class of the bot strategy, e.g. BotRSI
+        :param start_cash: amount of cash every candidate bot starts with
+        :param space: dictionary of parameter name -> (lowest, highest) integer, by default PARAMETER_SPACES
+        :param population: integer amount of candidates evaluated per generation (one batch)
+        :param generations: integer amount of generations
+        :param elite_fraction: fraction of the best candidates that are parents of the next generation
+        :param mutation: standard deviation of a mutation, as fraction of the range of the parameter
+        :param metric: metric that is maximized, e.g. sharpe or total_return
+        :param workers: integer amount of processes a batch is split over
+        :param seed: seed of the random generator, to make a search reproducible
+        """
+        self.simulator = simulator
+        self.bot_class = bot_class
+        self.start_cash = start_cash
+        self.space = space if space is not None else PARAMETER_SPACES[bot_class]
+        self.population = population
+        self.generations = generations
+        self.elite_fraction = elite_fraction
+        self.mutation = mutation
+        self.metric = metric
+        self.workers = workers
+        self.random = random.Random(seed)
+
+        self.scores = dict()  # Parameters (tuple of values in the order of space) -> score, so none is run twice
+
+    def run(self):
+        """
+        Runs the search
+        :return: dataframe of all evaluated parameters with their score and generation, best first
+        """
+        generation_of = dict()
+        candidates = self.random_candidates(self.population)
+
+        for generation in range(self.generations):
+            self.evaluate(candidates)
+            for candidate in candidates:
+                generation_of.setdefault(candidate, generation)
+
+            # The best candidates so far are the parents of the next generation
+            ranked = sorted(self.scores, key=self.scores.get, reverse=True)
+            parents = ranked[:max(2, math.ceil(self.elite_fraction * len(ranked)))]
+            candidates = self.offspring(parents, self.population)
+
+        results = pd.DataFrame(list(self.scores.keys()), columns=list(self.space.keys()))
+        results[self.metric] = list(self.scores.values())
+        results['generation'] = [generation_of[candidate] for candidate in self.scores]
+
+        return results.sort_values(self.metric, ascending=False, ignore_index=True)
+
+    @property
+    def best_params(self):
+        """Dictionary with the best parameters found so far"""
+        best = max(self.scores, key=self.scores.get)
+        return dict(zip(self.space.keys(), best))
+
+    def evaluate(self, candidates: list):
+        """Evaluates a batch of candidates in one simulation run, or split over several processes"""
+        candidates = [candidate for candidate in candidates if candidate not in self.scores]
+        if not candidates:
+            return
+
+        bots = [self.bot_class(self.start_cash, **dict(zip(self.space.keys(), candidate))) for candidate in candidates]
+
+        # All bots of the batch share the price data and indicator registry of the simulator
+        if self.workers > 1:
+            chunks = [bots[i::self.workers] for i in range(self.workers)]
+            with ProcessPoolExecutor(self.workers) as executor:
+                done = list(executor.map(_simulate_batch, [self.simulator] * len(chunks), chunks))
+            bots = [bot for chunk in done for bot in chunk]
+            candidates = [candidate for i in range(self.workers) for candidate in candidates[i::self.workers]]
+        else:
+            _simulate_batch(self.simulator, bots)
+
+        metrics = compute_bot_metrics(bots, self.simulator.stock_data, self.simulator.interval)
+        for candidate, score in zip(candidates, metrics[self.metric]):
+            self.scores[candidate] = score if not math.isnan(score) else -math.inf
+
+    def random_candidates(self, amount: int):
+        """Draws amount of different random candidates from the parameter space"""
+        candidates = set()
+        for _ in range(amount * 10):
+            candidates.add(tuple(self.random.randint(low, high) for low, high in self.space.values()))
+            if len(candidates) == amount:
+                break
+
+        return list(candidates)
+
+    def offspring(self, parents: list, amount: int):
+        """Creates new candidates by crossing over and mutating the parents, skipping already evaluated ones"""
+        children = set()
+        for _ in range(amount * 10):
+            mother, father = self.random.sample(parents, 2)
+            child = list()
+            for i, (low, high) in enumerate(self.space.values()):
+                # Take each parameter from a random parent and move it a random (normally distributed) step
+                value = self.random.choice((mother[i], father[i]))
+                value = round(value + self.random.gauss(0, self.mutation * (high - low)))
+                child.append(min(max(value, low), high))
+
+            if tuple(child) not in self.scores:
+                children.add(tuple(child))
+            if len(children) == amount:
+                break
+
+        return list(children)
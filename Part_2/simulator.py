@@ -1,157 +1,214 @@
 import pandas as pd
-import yfinance as yf
-# import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 
 import os.path
-from dateutil.relativedelta import relativedelta
+import sys
 
 from sp500 import get_sp500_tickers
 from bot import BotTemplate
+from price_store import PriceStore
+from indicators import IndicatorRegistry
+
+# Make the shared market_data package in the root of the project importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from market_data import get_prices, iter_prices
 
 
 class Simulator:
 
-    def __init__(self, bot_array: list[BotTemplate], stock_ticker, start_date, end_date, interval):
+    def __init__(self, bot_array: list[BotTemplate], stock_ticker, start_date, end_date, interval,
+                 compact=False, dtype='float32', stock_data=None, costs=None):
         """
         Creates a simulator object using specified parameters
         :param bot_array: array with bot objects used in simulation
-        :param stock_ticker: integer amount of stocks to simulate on (from S&P500)
+        :param stock_ticker: integer amount of stocks to simulate on (from S&P500), a list of tickers or one ticker
         :param start_date: date to start simulation from (historical data)
         :param end_date: date to stop simulation (e.g. today)
         :param interval: interval between simulation data points
+        :param compact: keep the prices in a compact PriceStore instead of a float64 dataframe (for large universes)
+        :param dtype: data type of the prices in the compact store
+        :param stock_data: dataframe with prices to simulate on instead of getting them, the first column is traded
+        :param costs: optional CostModel with the transaction costs and slippage of every fill of the bots
         """
         self.bot_array = bot_array
         self.stock_ticker = stock_ticker
         self.start_date = start_date
         self.end_date = end_date
         self.interval = interval
+        self.costs = costs
 
         # Amount of dataframe entries given to bots in first cycle
         self.history = 15
 
-        self.stock_data = self.get_stock_data()
-        print(self.stock_data)
+        # Bots that still get data each cycle (all bots, unless some are pruned during the simulation)
+        self.active_bots = list(self.bot_array)
+
+        # Prices that are given (e.g. one ticker of a cross-sectional run) are not fetched or printed again
+        given = stock_data is not None
+
+        # In compact mode the store is built ticker by ticker and the dataframe shares its memory with it,
+        # so the prices are never all in memory as float64
+        self.store = None
+        if compact and given:
+            self.store = PriceStore(stock_data, dtype)
+        elif compact:
+            columns = iter_prices(self.get_tickers(), self.start_date, self.end_date, self.interval)
+            self.store = PriceStore.from_columns(columns, dtype)
+        self.stock_data = self.store.frame() if compact else stock_data if given else self.get_stock_data()
+
+        # Indicators shared by all bots, so every (indicator, ticker, window) is only calculated once
+        self.indicators = IndicatorRegistry(self.stock_data)
+
+        if not given:
+            print(self.stock_data)
+
+    def simulate(self, pruner=None, plot=True, start=None, stop=None, checkpoint=None, exporter=None):
+        """
+        Runs the whole simulation by adding extra time steps and then calling sim_cycle
+        :param pruner: optional pruning scheduler (e.g. SuccessiveHalving) that drops losing bots during the run
+        :param plot: plot the graphs after the simulation, turn off for headless runs and searches
+        :param start: integer amount of rows the bots get in the first cycle, at least history (default)
+        :param stop: integer amount of rows after which the simulation stops, all rows by default
+        :param checkpoint: optional Checkpoint that saves the run regularly, so it can be continued with resume
+        :param exporter: optional LedgerExporter that streams the bot histories to Parquet files during the run
+        """
+        # A drained history is gone from the bots before a checkpoint can save it, so resuming would lose rows
+        if checkpoint is not None and exporter is not None and exporter.drain:
+            raise ValueError("A checkpoint cannot be combined with an exporter that drains the bot histories")
+
+        # Range of cycles to run, a part of the data can be simulated while the bots still see all earlier rows
+        first = self.history if start is None else max(self.history, start)
+        last = len(self.stock_data.index) if stop is None else min(stop, len(self.stock_data.index))
 
-    def simulate(self):
-        """Runs the whole simulation by adding extra time steps and then calling sim_cycle"""
         # Initiate all bots by giving them the stocks where they are going to get the data from
         for i in range(len(self.bot_array)):
             self.bot_array[i].initiate(self.stock_data.columns.tolist())
+        self.attach_bots()
+
+        # Bots that are still trading, the pruner can drop the worst ones at its milestones
+        self.active_bots = list(self.bot_array)
+        if pruner is not None:
+            pruner.setup(self.bot_array, last - first)
+
+        if checkpoint is not None:
+            checkpoint.start(self.bot_array)
+        if exporter is not None:
+            exporter.start(self.bot_array, self.stock_data, self.interval)
+
+        self.run_cycles(first, first, last, pruner, checkpoint, exporter)
+
+        # Plot the graphs using plotly
+        if plot:
+            self.plot_graphs()
+
+    def resume(self, checkpoint, pruner=None, plot=True):
+        """
+        Continues a simulation from its last checkpoint, the result is the same as when it was never stopped
+        :param checkpoint: Checkpoint the stopped simulation was saved with
+        :param pruner: the same kind of pruning scheduler the stopped simulation used, if any
+        :param plot: plot the graphs after the simulation
+        """
+        state = checkpoint.load()
+
+        # Continue with the saved bots, they replace the bots given to the simulator
+        self.bot_array = state['bots']
+        self.attach_bots()
+        self.active_bots = [self.bot_array[i] for i in state['active']]
+        if pruner is not None:
+            pruner.setup(self.bot_array, state['last'] - state['first'])
+            pruner.pruned = state['pruned']
+
+        self.run_cycles(state['first'], state['cursor'], state['last'], pruner, checkpoint)
+
+        if plot:
+            self.plot_graphs()
+
+    def attach_bots(self):
+        """Gives every bot the cost model and subscribes it to the indicators it uses on the stock it trades"""
+        for bot in self.bot_array:
+            bot.costs = self.costs
+            bot.indicators = self.indicators
+            for kind in bot.indicator_kinds:
+                self.indicators.subscribe(kind, self.stock_data.columns[0], bot.alfa)
 
+    def run_cycles(self, first, cursor, last, pruner=None, checkpoint=None, exporter=None):
+        """
+        Runs the sim cycles from cursor up to last
+        :param first: integer amount of rows the bots got in the first cycle of the run
+        :param cursor: integer amount of rows the bots get in the next cycle
+        :param last: integer amount of rows after which the simulation stops
+        :param pruner: optional pruning scheduler that drops losing bots during the run
+        :param checkpoint: optional Checkpoint that saves the run regularly
+        :param exporter: optional LedgerExporter that streams the bot histories to disk
+        """
         # Run all sim cycles by adding a time datapoint in each cycle
-        for i in range(self.history, len(self.stock_data.index)):
+        for i in range(cursor, last):
             self.sim_cycle(self.stock_data.iloc[:i])
 
-        # Plot the graphs using plotly
+            if pruner is not None:
+                self.active_bots = pruner.prune(i - first + 1, self.active_bots, self.stock_data.index[i - 1])
+
+            if checkpoint is not None and (checkpoint.due(i - first + 1) or i == last - 1):
+                checkpoint.save(i + 1, first, last, self.bot_array, self.active_bots, pruner)
+
+            if exporter is not None and exporter.due(i - first + 1):
+                exporter.flush()
+
+        if checkpoint is not None:
+            checkpoint.wait()
+        if exporter is not None:
+            exporter.close()
+
+    def plot_graphs(self):
+        """Plots all graphs of the simulation using plotly, which is only imported here so headless runs start faster"""
         self.plot_value_graphs()
         self.plot_rsi_graphs()
         self.plot_mov_avg_graphs()
 
     def sim_cycle(self, current_stock_data):
         """Everything that happens during one cycle of the simulation"""
-        # Looping over all the bots and giving them the current stock data, so they can trade
-        for i in range(len(self.bot_array)):
-            self.bot_array[i].trade(current_stock_data)
+        # Looping over all the active bots and giving them the current stock data, so they can trade
+        for bot in self.active_bots:
+            bot.trade(current_stock_data)
 
     def get_stock_data(self):
         """Gets stock data from yahoo finance and puts it in a dataframe"""
+        # Get the data of all tickers at once, it is only downloaded if it is not in the cache yet
+        return get_prices(self.get_tickers(), self.start_date, self.end_date, self.interval)
+
+    def get_tickers(self):
+        """Returns the tickers to simulate on"""
         # If stock_ticker is number: get first x amount of stocks from S&P500
         if isinstance(self.stock_ticker, int):
             # Get the first x amount of tickers from the S&P500 index
             tickers = get_sp500_tickers(self.stock_ticker)
 
+        # If it is a list of tickers, use those
+        elif isinstance(self.stock_ticker, list):
+            tickers = self.stock_ticker
+
         # Else it is a string, so use the specified stock_ticker and add ^GSPC
         else:
             tickers = [self.stock_ticker, "^GSPC"]
 
-        # Generate a filename based on the amount of stocks, the interval and the start and end date
-        filename = str(str(self.stock_ticker) + "_" + self.interval + "_" +
-                       self.start_date.strftime("%m-%d-%Y") + "_" +
-                       self.end_date.strftime("%m-%d-%Y") + ".csv")
-
-        # Check if that csv file already exists, which means that the data has been requested before
-        if not self.load_df(filename).empty:
-            # Load the data from this existing csv file into a dataframe and return it
-            return self.load_df(filename)
-        else:
-            # If it doesn't exist yet: request the data and save it into a csv file for later use
-            stock_data = self.download_stock_data_loop(tickers, self.start_date, self.end_date, self.interval)
-            self.save_df(stock_data, filename)
-            return stock_data
-
-    def download_stock_data_loop(self, tickers, start_date, end_date, interval):
-        """Downloads stock data from yahoo finance using loops if more than max data_amount per request is needed"""
-        # Create a list where the dataframes will be stored that have to be concatenated
-        df_list = list()
-
-        # Calculate the time between the start and end date in days
-        timespan = end_date - start_date
-        days = timespan.days
-
-        # The maximum amount of data that can be requested depends on the interval
-        if interval == "1m":
-            # Max for interval of 1 minute is 7 days of data, so if less just return data from one request
-            if days <= 7:
-                return self.read_price_data(tickers, start_date, end_date, interval)
-            else:
-                # Divide the total time up into segments of 7 days (max request time)
-                current_start_date = start_date
-                current_end_date = current_start_date + relativedelta(days=7)
-
-                # While not yet all the timespan has been covered: download all data for 7 days, then go to next 7 days
-                while current_end_date < end_date:
-                    df = self.read_price_data(tickers, current_start_date, current_end_date, interval)
-                    df_list.append(df)
-                    current_start_date = current_end_date
-                    current_end_date = current_start_date + relativedelta(days=7)
-
-                # If total timespan is not a multiple of 7 days the rest of the time still has to be downloaded
-                if current_start_date != end_date:
-                    df = self.read_price_data(tickers, current_start_date, end_date, interval)
-                    df_list.append(df)
-
-        elif interval == "2m" or interval == "5m" or interval == "15m" or interval == "30m" or interval == "60m" \
-                or interval == "90m" or interval == "1h":
-            # Max for interval lower than 1 day is 60 days of data, so if less just return data from one request
-            if days <= 60:
-                return self.read_price_data(tickers, start_date, end_date, interval)
-            else:
-                # Divide the total time up into segments of 60 days (max request time)
-                current_start_date = start_date
-                current_end_date = current_start_date + relativedelta(days=60)
-
-                # While not all the timespan has been covered: download all data for 60 days, then go to next 60 days
-                while current_end_date < end_date:
-                    df = self.read_price_data(tickers, current_start_date, current_end_date, interval)
-                    df_list.append(df)
-                    current_start_date = current_end_date
-                    current_end_date = current_start_date + relativedelta(days=60)
-
-                # If there is still a bit of not downloaded time left: request the data for the rest of the time
-                if current_start_date != end_date:
-                    df = self.read_price_data(tickers, current_start_date, end_date, interval)
-                    df_list.append(df)
-
-        # All intervals of 1 day or more can just download all data at once, so return the data from that request
-        else:
-            return self.read_price_data(tickers, start_date, end_date, interval)
+        return tickers
 
-        # Concatenate all the individual dataframes from the list into one dataframe and return it
-        return pd.concat(df_list)
+    def longest_history_dates(self):
+        """Returns the dates of the longest bot history, pruned bots have a shorter history"""
+        return list(max((bot.hist_trade.index for bot in self.bot_array), key=len).values)
 
     def plot_value_graphs(self):
         """Plots the value of all bots over time together with the value if stock was bought and held the whole time"""
+        import plotly.graph_objects as go
+
         # Looping over all the bots and plot the value of the bots in a graph
         df_bot_values = pd.DataFrame()
         fig = go.Figure()
         for bot in self.bot_array:
-            df_bot_values['date'] = list(bot.hist_trade.index.values)
             fig.add_trace(
-                go.Scatter(x=df_bot_values['date'], y=bot.hist_trade['value'],
+                go.Scatter(x=bot.hist_trade.index, y=bot.hist_trade['value'],
                            name=str(bot.__class__.__name__ + " " + str(bot.alfa)))
             )
+        df_bot_values['date'] = self.longest_history_dates()
 
         # Getting stock data to plot value if stocks bought at beginning and not sold & normalize to start_cash
         df_bot_values[self.stock_data.columns[0]] = self.stock_data[self.stock_data.columns[0]]\
@@ -172,17 +229,19 @@ class Simulator:
 
     def plot_mov_avg_graphs(self):
         """Plots the moving averages of the BotMovingAverage bots together with the stock price"""
+        import plotly.graph_objects as go
+
         # Looping over all the bots and plot the moving averages saved in hist_trade['var']
         df_bot_values = pd.DataFrame()
         fig = go.Figure()
         for bot in self.bot_array:
-            df_bot_values['date'] = list(bot.hist_trade.index.values)
             # Check if class is of type BotMovingAverage and otherwise don't plot the moving average
             if bot.__class__.__name__ == "BotMovingAverage":
                 fig.add_trace(
-                    go.Scatter(x=df_bot_values['date'], y=bot.hist_trade['var'],
+                    go.Scatter(x=bot.hist_trade.index, y=bot.hist_trade['var'],
                                name=str('Moving Average of bot ' + str(bot.alfa)))
                 )
+        df_bot_values['date'] = self.longest_history_dates()
 
         # Make the lines dotted, so the moving averages are distinguishable from the stock price line
         fig.update_traces(patch={"line": {"width": 2, "dash": 'dot'}})
@@ -205,6 +264,9 @@ class Simulator:
 
     def plot_rsi_graphs(self):
         """Plots the RSI calculation of a bot over time together with the stock price over time"""
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+
         # Create a dataframe with the stock price over time in it and the dates, handy for plotting
         df_stock_price = pd.DataFrame(self.stock_data[self.stock_data.columns[0]])
         df_stock_price['Date'] = self.stock_data.index.values
@@ -243,26 +305,3 @@ class Simulator:
         fig.update_xaxes(title_text="<b>Date</b>")
 
         fig.show()
-
-    def read_price_data(self, stock_symbol, start_date, end_date, interval):
-        """Imports price data from Yahoo Finance"""
-        try:
-            stock_data = yf.download(stock_symbol, start_date, end_date, interval=interval)
-        except:
-            return None
-
-        prices = stock_data.loc[:, "Adj Close"]
-        prices = prices.ffill()
-
-        return prices
-
-    def save_df(self, df: pd.DataFrame, filename):
-        """Saves a dataframe as a cvs file and returns it"""
-        df.to_csv(filename)
-
-    def load_df(self, filename):
-        """Loads a dataframe from a csv file and returns it"""
-        if not os.path.isfile(filename):
-            return pd.DataFrame
-
-        return pd.read_csv(filename, index_col=0)
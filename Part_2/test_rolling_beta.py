@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from rolling_beta import rolling_beta
+
+
+def make_prices(seed=0, bars=200):
+    """Random prices of an index and three stocks, with leading and scattered missing prices"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, (bars, 4))
+    returns[:, 1:] = returns[:, 1:] + returns[:, :1] * np.array([0.5, 1.0, 1.5])
+    prices = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), columns=["^GSPC", "A", "B", "C"],
+                          index=pd.date_range("2023-01-02", periods=bars, freq="B"))
+
+    # Stock B is listed later, stock C misses some prices
+    prices.iloc[:10, 2] = np.nan
+    prices.iloc[[50, 51, 120], 3] = np.nan
+    return prices
+
+
+def expected(prices, window=None, alpha=None):
+    """Beta and correlation of every stock calculated with pandas, only on the bars where both returns are known"""
+    returns = prices.pct_change(fill_method=None)
+    betas, correlations = dict(), dict()
+    for ticker in ["A", "B", "C"]:
+        x = returns["^GSPC"].where(returns[ticker].notna())
+        y = returns[ticker].where(x.notna())
+        if window is not None:
+            x = x.rolling(window, min_periods=2)
+            betas[ticker] = x.cov(y) / x.var()
+            correlations[ticker] = x.corr(y)
+        else:
+            x = x.ewm(alpha=alpha, adjust=False, ignore_na=True)
+            betas[ticker] = x.cov(y, bias=True) / x.var(bias=True)
+            correlations[ticker] = x.corr(y)
+    return pd.DataFrame(betas), pd.DataFrame(correlations)
+
+
+def test_windowed_matches_pandas_with_missing_prices():
+    prices = make_prices()
+    betas, correlations = rolling_beta(prices, window=30)
+    expected_betas, expected_correlations = expected(prices, window=30)
+
+    pd.testing.assert_frame_equal(betas, expected_betas, check_freq=False)
+    pd.testing.assert_frame_equal(correlations, expected_correlations, check_freq=False)
+
+    # The stock that was listed later gets a beta as soon as it has two returns
+    assert betas["B"].iloc[:12].isna().all() and betas["B"].iloc[12:].notna().all()
+
+
+def test_weighted_matches_pandas_with_missing_prices():
+    prices = make_prices(seed=1)
+    betas, correlations = rolling_beta(prices, alpha=0.05)
+    expected_betas, expected_correlations = expected(prices, alpha=0.05)
+
+    pd.testing.assert_frame_equal(betas, expected_betas, check_freq=False)
+    assert betas.iloc[-1].notna().all()
@@ -2,10 +2,13 @@ from simulator import Simulator
 from bot_rsi import BotRSI
 from bot_dhl import BotDHL
 from bot_movavg import BotMovingAverage
+from metrics import compute_bot_metrics, rank
+from export import load_bot_metrics
 
 
 class Trainer:
-    def __init__(self, bot_amount: int, stock_ticker, start_cash, start_date, end_date, interval):
+    def __init__(self, bot_amount: int, stock_ticker, start_cash, start_date, end_date, interval, compact=False,
+                 costs=None):
         """
         Creates a Trainer that has one simulator with alot of bots
         :param bot_amount: integer amount of bots that are tested
@@ -14,6 +17,8 @@ class Trainer:
         :param start_date: date to start the simulator
         :param end_date: date to end the simulator
         :param interval: interval between time steps e.g. 1h or 1d
+        :param compact: keep the prices in a compact PriceStore (for large universes)
+        :param costs: optional CostModel with the transaction costs and slippage the bots pay
         """
 
         # Create the bots with a threshold
@@ -37,16 +42,54 @@ class Trainer:
             bot_type = bot_type + 1
 
         # Create the sim
-        self.sim = Simulator(self.bot_list, stock_ticker, start_date, end_date, interval)
+        self.sim = Simulator(self.bot_list, stock_ticker, start_date, end_date, interval, compact, costs=costs)
 
-    def simulate(self):
+    def simulate(self, rank_by='sharpe', top_k=10, pruner=None, checkpoint=None, exporter=None, plot=True):
         """
         Simulates for all given bots and extracts the data
+        :param rank_by: metric the bots are ranked on, e.g. sharpe, total_return or max_drawdown
+        :param top_k: amount of best bots that are pushed to the console
+        :param pruner: optional pruning scheduler (e.g. SuccessiveHalving) that drops losing bots during the run
+        :param checkpoint: optional Checkpoint that saves the run regularly, so it can be continued with resume
+        :param exporter: optional LedgerExporter that streams the bot histories to Parquet files during the run
+        :param plot: plot the graphs after the simulation, turn off for headless runs
+        :return: dataframe with the performance metrics of all bots
         """
-        self.sim.simulate()
+        self.sim.simulate(pruner, plot=plot, checkpoint=checkpoint, exporter=exporter)
 
-        # push info to console
-        for bot in self.bot_list:
-            print(bot.alfa, ":", bot.value)
-            print("Historical trade data: \n", bot.hist_trade)
+        return self.extract_results(rank_by, top_k, pruner, exporter)
+
+    def resume(self, checkpoint, rank_by='sharpe', top_k=10, pruner=None, plot=True):
+        """
+        Continues a stopped simulation from its last checkpoint and extracts the data
+        :param checkpoint: Checkpoint the stopped simulation was saved with
+        :param rank_by: metric the bots are ranked on
+        :param top_k: amount of best bots that are pushed to the console
+        :param pruner: the same kind of pruning scheduler the stopped simulation used, if any
+        :param plot: plot the graphs after the simulation
+        :return: dataframe with the performance metrics of all bots
+        """
+        self.sim.resume(checkpoint, pruner, plot)
+        self.bot_list = self.sim.bot_array
+
+        return self.extract_results(rank_by, top_k, pruner)
+
+    def extract_results(self, rank_by='sharpe', top_k=10, pruner=None, exporter=None):
+        """Calculates the metrics of all bots after a simulation and pushes the best ones to the console"""
+        # Calculate the metrics of all bots at once, drained bots only have their history in the exported files
+        if exporter is not None and exporter.drain:
+            self.results = load_bot_metrics(exporter.directory)
+        else:
+            self.results = compute_bot_metrics(self.bot_list, self.sim.stock_data, self.sim.interval)
+
+        # Push the best bots to the console, pruned bots did not run until the end so they are not ranked
+        pruned = pruner.report().index if pruner is not None else ()
+        print("Top", top_k, "bots ranked on", rank_by, ": \n", rank(self.results, rank_by, top_k, pruned))
+
+        # Report which bots were pruned and when, their metrics are calculated up to the moment they were pruned
+        if pruner is not None:
+            self.results = self.results.join(pruner.report()[['cycle', 'date']].add_prefix('pruned_'))
+            print("Pruned bots: \n", pruner.report())
+
+        return self.results
 
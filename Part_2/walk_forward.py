@@ -0,0 +1,129 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from metrics import compute_bot_metrics
+from search import PARAMETER_SPACES
+
+
+def walk_forward_folds(bars: int, train: int, test: int, step: int = None, first: int = 15):
+    """
+    Splits the bars of a simulation into rolling train/test windows
+    :param bars: integer amount of rows of the stock data
+    :param train: integer amount of cycles in each train window
+    :param test: integer amount of cycles in each test window, directly after its train window
+    :param step: integer amount of cycles the windows move forward per fold, test by default (no overlapping tests)
+    :param first: integer amount of rows the bots get in the first cycle (history of the simulator)
+    :return: list of (train start, test start, test stop) tuples, as used by Simulator.simulate(start, stop)
+    """
+    step = test if step is None else step
+
+    folds = list()
+    start = first
+    while start + train + test <= bars:
+        folds.append((start, start + train, start + train + test))
+        start = start + step
+
+    return folds
+
+
+def parameter_grid(space: dict, points=5):
+    """
+    Spreads a parameter space over a grid of candidates
+    :param space: dictionary of parameter name -> (lowest, highest) integer
+    :param points: integer amount of values per parameter
+    :return: list of dictionaries with the parameters of every candidate
+    """
+    values = [sorted(set(np.linspace(low, high, points).round().astype(int).tolist())) for low, high in space.values()]
+    return [dict(zip(space.keys(), combination)) for combination in itertools.product(*values)]
+
+
+def _run_fold(simulator, bot_class, start_cash, candidates: list, fold: tuple, metric):
+    """
+    Picks the best candidate on the train window of a fold and evaluates it on the test window
+    :return: dictionary with the chosen parameters, its train score and its test metrics
+    """
+    train_start, test_start, test_stop = fold
+
+    # In-sample: run all candidates in one batch and pick the best one
+    bots = [bot_class(start_cash, **params) for params in candidates]
+    simulator.bot_array = bots
+    simulator.simulate(plot=False, start=train_start, stop=test_start)
+    train_metrics = compute_bot_metrics(bots, simulator.stock_data, simulator.interval)
+    scores = train_metrics[metric].fillna(-np.inf).to_numpy()
+    best = int(np.argmax(scores))
+
+    # Out-of-sample: a fresh bot with the chosen parameters trades the test window
+    bot = bot_class(start_cash, **candidates[best])
+    simulator.bot_array = [bot]
+    simulator.simulate(plot=False, start=test_start, stop=test_stop)
+    test_metrics = compute_bot_metrics([bot], simulator.stock_data, simulator.interval).iloc[0]
+
+    dates = simulator.stock_data.index
+    result = {'train_start': dates[train_start - 1], 'test_start': dates[test_start - 1],
+              'test_end': dates[test_stop - 2]}
+    result.update(candidates[best])
+    result['train_' + metric] = scores[best]
+    result.update(test_metrics.add_prefix('test_').to_dict())
+
+    return result
+
+
+class WalkForward:
+    def __init__(self, simulator, bot_class, start_cash, train: int, test: int, step: int = None,
+                 candidates: list = None, metric='sharpe', workers=1):
+        """
+        Creates a walk-forward optimization that picks parameters on a train window and tests them on the next window
+        :param simulator: Simulator with the price data, all folds are cut from its data
+        :param bot_class: class of the bot strategy, e.g. BotRSI
+        :param start_cash: amount of cash every bot starts with
+        :param train: integer amount of cycles in each train window
+        :param test: integer amount of cycles in each test window
+        :param step: integer amount of cycles the windows move forward per fold, test by default
+        :param candidates: list of dictionaries with the parameters to choose from, a grid over PARAMETER_SPACES by default
+        :param metric: metric that is maximized on the train window, e.g. sharpe or total_return
+        :param workers: integer amount of processes the folds are run on
+        """
+        self.simulator = simulator
+        self.bot_class = bot_class
+        self.start_cash = start_cash
+        self.candidates = candidates if candidates is not None else parameter_grid(PARAMETER_SPACES[bot_class])
+        self.metric = metric
+        self.workers = workers
+
+        self.folds = walk_forward_folds(len(simulator.stock_data.index), train, test, step, simulator.history)
+
+    def run(self):
+        """
+        Runs all folds
+        :return: dataframe with one row per fold: its dates, the chosen parameters and the train and test metrics
+        """
+        # Calculate the indicators of all candidates once over the whole data, every fold reuses the same arrays
+        ticker = self.simulator.stock_data.columns[0]
+        for params in self.candidates:
+            bot = self.bot_class(self.start_cash, **params)
+            for kind in bot.indicator_kinds:
+                self.simulator.indicators.subscribe(kind, ticker, bot.alfa)
+
+        arguments = [[self.simulator] * len(self.folds), [self.bot_class] * len(self.folds),
+                     [self.start_cash] * len(self.folds), [self.candidates] * len(self.folds), self.folds,
+                     [self.metric] * len(self.folds)]
+
+        # The folds are independent, so they can run at the same time
+        if self.workers > 1:
+            with ProcessPoolExecutor(self.workers) as executor:
+                results = list(executor.map(_run_fold, *arguments))
+        else:
+            results = list(map(_run_fold, *arguments))
+
+        results = pd.DataFrame(results)
+        results.index.name = 'fold'
+
+        return results
+
+    @staticmethod
+    def out_of_sample_return(results: pd.DataFrame):
+        """Total return of trading all test windows after each other with the chosen parameters"""
+        return (1 + results['test_total_return']).prod() - 1
@@ -1,30 +1,67 @@
-import numpy
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
 
-def capm_calculator(index_share_df):
-    # Change dataframe (table) from price levels to returns (in percentages)
-    df = index_share_df.pct_change()*100
-    df = df.dropna()
-
-    # Calculate covariance of dataframe and extract the covariance of the share and the market
-    cov_matrix = df.cov()
-    covariance_share_market = cov_matrix.iat[0, 1]
-
-    # Calculate the variance and extract the variance of the market
-    var_series = df.var()
-    variance_market = var_series.iloc[0]
-
-    # Calculate the beta
-    capm_beta = covariance_share_market / variance_market
-
-    print("The CAPM-beta of", df.columns.values[1], "compared to", df.columns.values[0], "is:", capm_beta)
+def capm_batch(returns_df: pd.DataFrame, index_column=None):
+    """
+    Calculates the CAPM regression of every stock against the index in one linear algebra pass
+    :param returns_df: dataframe of returns with the index and N stocks as columns, missing returns may be NaN
+    :param index_column: name of the index column, by default the first column
+    :return: dataframe with per stock the beta, alpha, R^2, standard errors of beta and alpha and observations
+    """
+    if index_column is None:
+        index_column = returns_df.columns[0]
+
+    stocks = returns_df.drop(columns=index_column)
+    index_returns = returns_df[index_column].to_numpy(dtype='float64')[:, np.newaxis]
+    stock_returns = stocks.to_numpy(dtype='float64')
+
+    # Only use the dates where both the index and the stock have a return, per stock
+    valid = ~np.isnan(stock_returns) & ~np.isnan(index_returns)
+    x = np.where(valid, index_returns, 0)
+    y = np.where(valid, stock_returns, 0)
+
+    # Sums of all stocks at once, each column only contains its own valid dates
+    n = valid.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = x.sum(axis=0) / n
+        y_mean = y.sum(axis=0) / n
+        s_xx = (x * x).sum(axis=0) - n * x_mean ** 2
+        s_yy = (y * y).sum(axis=0) - n * y_mean ** 2
+        s_xy = (x * y).sum(axis=0) - n * x_mean * y_mean
+
+        # Ordinary least squares: y = alpha + beta * x
+        beta = s_xy / s_xx
+        alpha = y_mean - beta * x_mean
+        r_2 = s_xy ** 2 / (s_xx * s_yy)
+
+        # Standard errors from the variance of the residuals
+        residual_var = (s_yy - beta * s_xy) / (n - 2)
+        beta_se = np.sqrt(residual_var / s_xx)
+        alpha_se = np.sqrt(residual_var * (1 / n + x_mean ** 2 / s_xx))
+
+    return pd.DataFrame({'beta': beta, 'alpha': alpha, 'r_2': r_2,
+                         'beta_se': beta_se, 'alpha_se': alpha_se, 'n': n}, index=stocks.columns)
+
+
+def plot_capm(returns_df: pd.DataFrame, capm_result: pd.DataFrame, stock_column=None):
+    """
+    Plots the returns of a stock against the returns of the index together with the CAPM trend line
+    :param returns_df: dataframe of returns with the index as first column
+    :param capm_result: dataframe as returned by capm_batch
+    :param stock_column: name of the stock to plot, by default the second column
+    """
+    # matplotlib is only imported when a plot is made, so headless runs start faster
+    import matplotlib.pyplot as plt
+
+    index_column = returns_df.columns[0]
+    if stock_column is None:
+        stock_column = returns_df.columns[1]
 
     # Get returns as arrays so they can be plotted as a scatterplot
-    index_returns = df[df.columns.values[0]].to_numpy()
-    share_returns = df[df.columns.values[1]].to_numpy()
+    df = returns_df[[index_column, stock_column]].dropna()
+    index_returns = df[index_column].to_numpy()
+    share_returns = df[stock_column].to_numpy()
 
     # Calculating max_values so the plot can be centered around 0
     max_val = max(max(abs(index_returns)), max(abs(share_returns)))
@@ -35,23 +72,17 @@ def capm_calculator(index_share_df):
 
     # Generating scatter plot
     plt.scatter(index_returns, share_returns, marker='o')
-    plt.xlabel(df.columns.values[0])
-    plt.ylabel(df.columns.values[1])
+    plt.xlabel(index_column)
+    plt.ylabel(stock_column)
 
     # Adding horizontal and vertical zero lines
     plt.axhline(0, color='black', linewidth=0.5)
     plt.axvline(0, color='black', linewidth=0.5)
 
-    # Get the beta as a trend line and plot it
-    beta_scatter = np.polyfit(index_returns, share_returns, 1)
-    trend_line = np.poly1d(beta_scatter)
-    plt.plot(index_returns, trend_line(index_returns), "r--", linewidth=1)
-
-    # Calculate the R^2
-    corr_matrix = numpy.corrcoef(share_returns, trend_line(index_returns))
-    correlation = corr_matrix[0, 1]
-    r_2 = correlation**2
-    print("The R^2 value of this beta is:", r_2)
+    # Plot the beta as a trend line
+    alpha = capm_result.at[stock_column, 'alpha']
+    beta = capm_result.at[stock_column, 'beta']
+    plt.plot(index_returns, alpha + beta * index_returns, "r--", linewidth=1)
 
     plt.show()
 
@@ -59,3 +90,20 @@ def capm_calculator(index_share_df):
     plt.show()
 
 
+def capm_calculator(index_share_df, plot=True):
+    # Change dataframe (table) from price levels to returns (in percentages)
+    df = index_share_df.pct_change()*100
+    df = df.dropna()
+
+    # Calculate the beta and R^2 of the share compared to the market
+    capm_result = capm_batch(df)
+    capm_beta = capm_result.iat[0, 0]
+    r_2 = capm_result.at[df.columns.values[1], 'r_2']
+
+    print("The CAPM-beta of", df.columns.values[1], "compared to", df.columns.values[0], "is:", capm_beta)
+    print("The R^2 value of this beta is:", r_2)
+
+    if plot:
+        plot_capm(df, capm_result)
+
+    return capm_result
@@ -0,0 +1,115 @@
+import math
+import numpy as np
+import pandas as pd
+from math import exp, sqrt, log
+from scipy.stats import norm
+
+
+def binomial_lattice(S0, K, r, v, T, n, call_put, exercise_policy):
+    time_step = T / n
+
+    # Calculate risk-free return rate per time step instead of per year
+    r_per_time_step = math.e ** (r * time_step)
+
+    # Compute u and d
+    u = math.e ** (v * sqrt(time_step))
+    d = math.e ** -(v * sqrt(time_step))
+
+    # Compute p and q
+    """ Fill in appropriate formulas"""
+    p = (r_per_time_step - d) / (u - d)
+    q = 0
+
+    # Create empty matrix for stock prices
+    stock_price = np.zeros((n + 1, n + 1))
+
+    # Set initial stock price
+    stock_price[0, 0] = S0
+
+    # Fill matrix with stock prices per time step
+    for i in range(1, n + 1):
+        stock_price[i, 0] = stock_price[i - 1, 0] * u
+        for j in range(1, i + 1):
+            stock_price[i, j] = stock_price[i - 1, j - 1] * d
+
+    # Transform numpy matrix into Pandas Dataframe
+    df_stock_price = pd.DataFrame(data=stock_price)
+    df_stock_price = df_stock_price.T
+
+    # Create empty matrix for option values
+    option_value = np.zeros((n + 1, n + 1))
+
+    # For final time step, compute option value based on stock price and strike price
+    for i in range(n + 1):
+        if call_put == 'Call':
+            if stock_price[n, i] <= K:
+                option_value[n, i] = 0
+            else:
+                option_value[n, i] = stock_price[n, i] - K
+        elif call_put == 'Put':
+            if stock_price[n, i] >= K:
+                option_value[n, i] = 0
+            else:
+                option_value[n, i] = K - stock_price[n, i]
+
+    # Compute discount factor per time step
+    discount = r_per_time_step - q
+
+    # Recursively compute option value at time 0
+    for i in range(n - 1, -1, -1):
+        for j in range(i + 1):
+
+            option_value[i, j] = (1 / discount) * (p * option_value[i + 1, j] + (1 - p) * option_value[i + 1, j + 1])
+
+            if exercise_policy == 'American':
+                if call_put == 'Call':
+                    if option_value[i, j] < stock_price[i, j] - K:
+                        option_value[i, j] = stock_price[i, j] - K
+                elif call_put == 'Put':
+                    if option_value[i, j] < K - stock_price[i, j]:
+                        option_value[i, j] = K - stock_price[i, j]
+
+    df_option_value = pd.DataFrame(data=option_value).T
+    return option_value[0, 0], df_stock_price, df_option_value
+
+
+def black_scholes(S0, K, v, T, r):
+    r_maturity = math.e ** (r * T)
+    d1 = math.log(S0 / (K / r_maturity), math.e) / v * sqrt(T) + v * sqrt(T) / 2
+    d2 = d1 - v * sqrt(T)
+    return (norm.cdf(d1) * S0) - (norm.cdf(d2) * (K / r_maturity))
+
+
+def black_scholes_vega(S, K, T, r, v):
+    d1 = (log(S / K) + (r + 0.5 * v ** 2) * T) / (v * sqrt(T))
+    return S * norm.pdf(d1) * sqrt(T)
+
+
+"""Implied volatility is found using the Newton-Raphson method"""
+
+
+def compute_implied_volatility(true_price, S, K, r, T, n, call_put, exercise_policy):
+    MAX_NO_ITERATIONS = 100
+    MAX_VOL_UPDATE = 0.1
+    ACCURACY = 1.0e-5
+
+    implied_vol = .5  # Initial estimate for implied volatility
+
+    for i in range(MAX_NO_ITERATIONS):
+        # Compute price with binomial lattice, using current estimate for implied volatility
+        model_price, _, _ = binomial_lattice(S, K, r, implied_vol, T, n, call_put, exercise_policy)
+
+        # Compute difference between model price and market price (the root)
+        diff = model_price - true_price
+
+        # Terminate algorithm if desired precision has been hit
+        if (abs(diff) < ACCURACY):
+            return implied_vol
+
+        # Update implied volatility based on vega and observed error
+        vega = black_scholes_vega(S, K, T, r, implied_vol)
+
+        implied_vol -= np.clip(diff / vega, -MAX_VOL_UPDATE, MAX_VOL_UPDATE)
+
+    # If maximum number of iterations is hit, simply return best estimate so far
+    return implied_vol
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+from scipy.fft import rfft, irfft, next_fast_len
+from scipy.stats import chi2
+
+
+def autocorrelation(returns, max_lag: int):
+    """
+    Calculates the autocorrelation function of every ticker up to max_lag at once using the FFT
+    :param returns: matrix (time x tickers) of returns, a 1D array is treated as a single ticker
+    :param max_lag: integer of the highest lag the autocorrelation is calculated for
+    :return: matrix (max_lag + 1 x tickers) with the autocorrelation per lag, lag 0 is always 1
+    """
+    returns = np.asarray(returns, dtype='float64')
+    if returns.ndim == 1:
+        returns = returns[:, np.newaxis]
+
+    # Missing returns (e.g. before a stock was listed) do not contribute to any lag
+    valid = ~np.isnan(returns)
+    demeaned = np.where(valid, returns - np.nanmean(returns, axis=0), 0)
+
+    # Zero pad to at least twice the length so the circular convolution of the FFT becomes a linear one
+    size = next_fast_len(2 * len(demeaned) - 1, real=True)
+    spectrum = rfft(demeaned, n=size, axis=0)
+
+    # The inverse FFT of the power spectrum gives the autocovariance for all lags of all columns
+    autocovariance = irfft(spectrum * np.conj(spectrum), n=size, axis=0)[:max_lag + 1]
+
+    # Normalize by the variance (lag 0) to get the autocorrelation
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return autocovariance / autocovariance[0]
+
+
+def ljung_box(acf, n, max_lag: int):
+    """
+    Calculates the Ljung-Box Q statistic and p-value for every lag from 1 up to max_lag
+    :param acf: matrix (lags x tickers) of autocorrelations as returned by autocorrelation
+    :param n: amount of observations per ticker (integer or array with one entry per ticker)
+    :param max_lag: integer of the highest lag the test is done for
+    :return: matrices (max_lag x tickers) with the Q statistics and the p-values
+    """
+    lags = np.arange(1, max_lag + 1)[:, np.newaxis]
+    n = np.asarray(n, dtype='float64')
+
+    # Q(h) = n(n+2) * sum of acf(k)^2 / (n-k) for k = 1..h, so the cumulative sum gives all h at once
+    q_stat = n * (n + 2) * np.cumsum(acf[1:max_lag + 1] ** 2 / (n - lags), axis=0)
+    p_value = chi2.sf(q_stat, lags)
+
+    return q_stat, p_value
+
+
+def acf_analysis(returns, max_lag: int):
+    """
+    Calculates the autocorrelation and Ljung-Box test for a whole matrix of tickers
+    :param returns: DataFrame or matrix (time x tickers) of returns
+    :param max_lag: integer of the highest lag to analyse
+    :return: DataFrames of the autocorrelation, Ljung-Box Q statistic and p-value (lags x tickers)
+    """
+    returns = pd.DataFrame(returns)
+
+    acf = autocorrelation(returns.to_numpy(), max_lag)
+    q_stat, p_value = ljung_box(acf, returns.count().to_numpy(), max_lag)
+
+    # Put the results in dataframes with the lags as index and tickers as columns
+    lags = np.arange(1, max_lag + 1)
+    df_acf = pd.DataFrame(acf, index=np.arange(max_lag + 1), columns=returns.columns).rename_axis('Lag')
+    df_q_stat = pd.DataFrame(q_stat, index=lags, columns=returns.columns).rename_axis('Lag')
+    df_p_value = pd.DataFrame(p_value, index=lags, columns=returns.columns).rename_axis('Lag')
+
+    return df_acf, df_q_stat, df_p_value
@@ -1,21 +1,20 @@
-import yfinance as yf
-import pandas as pd
+import os
+import sys
+
+# Make the shared market_data package in the root of the project importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from market_data import get_price, get_company_name
 
 
 def read_price_data(stock_symbol, start_date, end_date, interval):
     """Import price data from Yahoo Finance"""
-    try:
-        stock_data = yf.download(stock_symbol, start_date, end_date, interval=interval)
-    except:
+    prices = get_price(stock_symbol, start_date, end_date, interval)
+    if prices.empty:
         return None
 
-    prices = stock_data.loc[:, "Adj Close"]
-    prices = prices.ffill()
     prices = prices.pct_change()*100
     prices = prices.dropna()
 
-    ticker = yf.Ticker(stock_symbol)
-    company_name = ticker.info['longName']
+    company_name = get_company_name(stock_symbol)
 
     return company_name, prices.values
-
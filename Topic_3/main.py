@@ -4,6 +4,7 @@ from datareader import read_price_data
 import matplotlib.pyplot as plt
 import numpy as np
 from white_noise import get_white_noise_array
+from autocorrelation import acf_analysis
 
 # natte sokken
 
@@ -29,6 +30,12 @@ corr_price = corr_matrix_price[1, 0]
 corr_matrix_white = np.corrcoef(white_noise, shifted_white_noise)
 corr_white = corr_matrix_white[1, 0]
 
+# Get the autocorrelation and Ljung-Box test up to max_lag for the returns and the white noise at once
+max_lag = 10
+df_acf, df_q_stat, df_p_value = acf_analysis({company_name: price_data.ravel(), "White noise": white_noise}, max_lag)
+print("Autocorrelation:\n", df_acf)
+print("Ljung-Box p-values:\n", df_p_value)
+
 # Create subplot
 fig = plt.figure()
 ax1 = fig.add_subplot(121)
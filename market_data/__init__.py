@@ -0,0 +1,3 @@
+"""Shared access to market data for all topics: one fetch path with an in-process memo and a disk cache"""
+from market_data.prices import get_prices, get_price, iter_prices, download_prices, clear_memo, CACHE_DIR
+from market_data.constituents import get_sp500_constituents, get_sp500_tickers, get_metadata, get_company_name
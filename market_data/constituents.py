@@ -0,0 +1,158 @@
+import json
+import os.path
+import threading
+import time
+
+import pandas as pd
+
+from market_data.prices import CACHE_DIR
+
+# Snapshot of the S&P500 constituents that is shipped with the project, used when there is no network
+SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sp500_snapshot.csv")
+CONSTITUENTS_FILE = os.path.join(CACHE_DIR, "sp500_constituents.csv")
+METADATA_FILE = os.path.join(CACHE_DIR, "ticker_metadata.json")
+
+# How long (in seconds) the cached constituents and metadata are used before they are refreshed
+CONSTITUENTS_TTL = 7 * 24 * 60 * 60
+METADATA_TTL = 30 * 24 * 60 * 60
+
+# Fields of the yahoo finance info that are kept in the metadata store
+METADATA_FIELDS = ["longName", "shortName", "sector", "industry", "currency", "exchange"]
+
+_constituents = None  # In-process copy of the constituents dataframe
+_metadata = None  # In-process copy of the metadata store: {ticker: {field: value, "fetched": timestamp}}
+_lock = threading.Lock()
+
+
+def get_sp500_constituents(ttl=CONSTITUENTS_TTL):
+    """
+    Gets the S&P500 constituents, only scraping Wikipedia if the cached list is older than ttl
+    :param ttl: maximum age in seconds of the cached list
+    :return: dataframe with a Symbol and Security column, sorted by Symbol
+    """
+    global _constituents
+
+    with _lock:
+        if _constituents is not None:
+            return _constituents
+
+        # Use the cached list if it is fresh enough, else try to refresh it from Wikipedia
+        if _is_fresh(CONSTITUENTS_FILE, ttl):
+            _constituents = _sorted(pd.read_csv(CONSTITUENTS_FILE))
+            return _constituents
+
+        try:
+            constituents = _sorted(_scrape_sp500())
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            _write_atomic(CONSTITUENTS_FILE, constituents.to_csv(index=False))
+        except Exception:
+            # Without network fall back to an outdated cached list, or else to the snapshot
+            constituents = _sorted(pd.read_csv(CONSTITUENTS_FILE if os.path.isfile(CONSTITUENTS_FILE)
+                                               else SNAPSHOT_FILE))
+
+        _constituents = constituents
+        return _constituents
+
+
+def get_sp500_tickers(amount: int = None):
+    """Gets specified amount of sp500 stocks in order of their ticker (all if amount is None)"""
+    return get_sp500_constituents()["Symbol"].tolist()[:amount]
+
+
+def get_metadata(ticker, ttl=METADATA_TTL):
+    """
+    Gets the metadata of a ticker, only querying yahoo finance if the stored metadata is older than ttl
+    :param ticker: ticker symbol
+    :param ttl: maximum age in seconds of the stored metadata
+    :return: dictionary with the METADATA_FIELDS that are known for the ticker
+    """
+    global _metadata
+
+    with _lock:
+        if _metadata is None:
+            _metadata = _load_metadata()
+
+        entry = _metadata.get(ticker)
+        if entry is not None and time.time() - entry["fetched"] < ttl:
+            return entry
+
+    try:
+        # yfinance is only imported when metadata is actually fetched, it is slow to import
+        import yfinance as yf
+        info = yf.Ticker(ticker).info
+        entry = {field: info[field] for field in METADATA_FIELDS if field in info}
+    except Exception:
+        # Keep using outdated metadata if there is any, else use the name of the snapshot or the ticker itself
+        if entry is not None:
+            return entry
+        return {"longName": _snapshot_name(ticker)}
+
+    entry["fetched"] = time.time()
+    with _lock:
+        _metadata[ticker] = entry
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _write_atomic(METADATA_FILE, json.dumps(_metadata))
+
+    return entry
+
+
+def get_company_name(ticker):
+    """Gets the long name of the company of a ticker"""
+    metadata = get_metadata(ticker)
+    return metadata.get("longName") or metadata.get("shortName") or _snapshot_name(ticker)
+
+
+def _scrape_sp500():
+    """Scrapes the table of S&P500 companies from Wikipedia"""
+    # The scraping libraries are only imported when the cached list is outdated
+    import bs4 as bs
+    import requests
+
+    # Request the table of S&P500 companies from Wikipedia and "scrape" it of the page
+    resp = requests.get('http://en.wikipedia.org/wiki/List_of_S%26P_500_companies', timeout=10)
+    soup = bs.BeautifulSoup(resp.text, 'lxml')
+    table = soup.find('table', {'class': 'wikitable sortable'})
+
+    # Find the ticker and company name in each row, without the newlines
+    rows = list()
+    for row in table.findAll('tr')[1:]:
+        cells = row.findAll('td')
+        rows.append([cells[0].text.replace('\n', ''), cells[1].text.replace('\n', '')])
+
+    return pd.DataFrame(rows, columns=["Symbol", "Security"])
+
+
+def _sorted(constituents: pd.DataFrame):
+    """
+    Sorts the constituents by ticker, so the first x stocks are the same whether the list was scraped, cached or
+    read from the snapshot (the Wikipedia table is sorted on full company names that are not in the table itself)
+    """
+    return constituents.sort_values("Symbol", ignore_index=True)
+
+
+def _snapshot_name(ticker):
+    """Looks up the company name in the constituents, falls back to the ticker itself"""
+    constituents = get_sp500_constituents()
+    names = constituents.loc[constituents["Symbol"] == ticker, "Security"]
+    return names.iloc[0] if not names.empty else ticker
+
+
+def _load_metadata():
+    """Loads the metadata store from disk"""
+    if not os.path.isfile(METADATA_FILE):
+        return dict()
+    with open(METADATA_FILE) as file:
+        return json.load(file)
+
+
+def _is_fresh(filename, ttl):
+    """Checks if a file exists and was written less than ttl seconds ago"""
+    return os.path.isfile(filename) and time.time() - os.path.getmtime(filename) < ttl
+
+
+def _write_atomic(filename, text):
+    """Writes to a temporary file first, so a crash never leaves a half written file"""
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, "w") as file:
+        file.write(text)
+    os.replace(temp_filename, filename)
@@ -0,0 +1,333 @@
+import datetime
+import json
+import os.path
+import threading
+
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from market_data.resample import base_intervals, resample_prices
+
+# Folder where downloaded price data is saved, shared by all scripts of the project
+CACHE_DIR = os.environ.get("MARKET_DATA_CACHE",
+                           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_cache"))
+
+# Maximum amount of days Yahoo Finance returns per request for intervals smaller than one day
+MAX_REQUEST_DAYS = {"1m": 7, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "60m": 60, "90m": 60, "1h": 60}
+
+# Amount of days before the end of the cached data that are downloaded again when the cache is extended
+OVERLAP_DAYS = 5
+OVERLAP_DAYS_INTRADAY = 1
+
+_memo = dict()  # In-process memo of price series keyed on (ticker, interval, start_date, end_date)
+_in_flight = dict()  # Keys that are being fetched right now, with an event that is set when they are done
+_lock = threading.Lock()
+
+
+def get_prices(tickers: list, start_date, end_date, interval):
+    """
+    Gets the adjusted close prices of all tickers, hitting the network at most once per (ticker, interval, range)
+    :param tickers: list of ticker symbols
+    :param start_date: first date of the data
+    :param end_date: end date of the data (exclusive)
+    :param interval: interval between data points (e.g. 1m, 1h, 1d)
+    :return: dataframe with the dates as index and one column of prices per ticker, in the order of tickers
+    """
+    keys, _ = _fetch(tickers, start_date, end_date, interval)
+
+    # Put all series together, tickers that could not be fetched become empty columns
+    series_list = [_memo[keys[ticker]].rename(ticker) for ticker in tickers if keys[ticker] in _memo]
+    if not series_list:
+        return pd.DataFrame(columns=tickers)
+    prices = pd.concat(series_list, axis=1).reindex(columns=tickers).sort_index()
+
+    return prices.ffill()
+
+
+def iter_prices(tickers: list, start_date, end_date, interval, chunk_size=50):
+    """
+    Gets the adjusted close prices ticker by ticker, so other structures can be built without a float64 dataframe.
+    Only one chunk of tickers is kept at a time: the memo entries this call created are dropped after their chunk
+    :param tickers: list of ticker symbols
+    :param start_date: first date of the data
+    :param end_date: end date of the data (exclusive)
+    :param interval: interval between data points (e.g. 1m, 1h, 1d)
+    :param chunk_size: amount of tickers that are loaded or downloaded together
+    :return: generator of (ticker, series), the series is None if the ticker could not be fetched
+    """
+    for i in range(0, len(tickers), chunk_size):
+        chunk = tickers[i:i + chunk_size]
+        keys, fetched = _fetch(chunk, start_date, end_date, interval)
+        try:
+            for ticker in chunk:
+                yield ticker, _memo.get(keys[ticker])
+        finally:
+            # Entries that were in the memo before belong to other callers and stay
+            with _lock:
+                for ticker in fetched:
+                    _memo.pop(keys[ticker], None)
+
+
+def _fetch(tickers, start_date, end_date, interval):
+    """
+    Puts the prices of all tickers in the memo, fetching each (ticker, interval, range) only once over all threads
+    :return: dictionary of ticker -> memo key, and the list of tickers this call fetched itself
+    """
+    keys = {ticker: _key(ticker, start_date, end_date, interval) for ticker in tickers}
+
+    # Claim the tickers nobody is fetching yet, wait for the ones another thread is already fetching
+    to_fetch = list()
+    to_wait = list()
+    with _lock:
+        for ticker, key in keys.items():
+            if key in _memo:
+                continue
+            if key in _in_flight:
+                to_wait.append(_in_flight[key])
+            else:
+                _in_flight[key] = threading.Event()
+                to_fetch.append(ticker)
+
+    # Fetch all claimed tickers together: first from the disk cache, the rest in one bulk download
+    if to_fetch:
+        try:
+            fetched = _load_or_download(to_fetch, start_date, end_date, interval)
+            with _lock:
+                for ticker, prices in fetched.items():
+                    _memo[keys[ticker]] = prices
+        finally:
+            with _lock:
+                for ticker in to_fetch:
+                    _in_flight.pop(keys[ticker]).set()
+
+    for event in to_wait:
+        event.wait()
+
+    return keys, to_fetch
+
+
+def get_price(ticker, start_date, end_date, interval):
+    """Gets the adjusted close prices of a single ticker as a series"""
+    return get_prices([ticker], start_date, end_date, interval)[ticker]
+
+
+def clear_memo():
+    """Empties the in-process memo, the disk cache stays"""
+    with _lock:
+        _memo.clear()
+
+
+def _key(ticker, start_date, end_date, interval):
+    """Creates the memo key of a ticker and range"""
+    return ticker, interval, start_date.strftime("%m-%d-%Y"), end_date.strftime("%m-%d-%Y")
+
+
+def _cache_file(ticker, interval, extension="csv"):
+    """Generates the cache filename of a ticker and interval, one file holds all data fetched so far"""
+    return os.path.join(CACHE_DIR, ticker + "_" + interval + "." + extension)
+
+
+def _load_or_download(tickers, start_date, end_date, interval):
+    """Loads the tickers from the disk cache and downloads only the parts that are not covered yet"""
+    start_date = _to_date(start_date)
+    end_date = _to_date(end_date)
+    fetched = dict()
+    cached = dict()
+    missing_ranges = dict()  # (fetch_start, fetch_end) -> tickers that need that range
+
+    # Check which part of the requested range is already covered by the cache of each ticker
+    for ticker in tickers:
+        coverage = _read_coverage(ticker, interval)
+
+        # If this interval is not cached for the whole range, try to build it from cached finer bars
+        if not _covers(coverage, start_date, end_date):
+            resampled = _load_resampled(ticker, start_date, end_date, interval)
+            if resampled is not None:
+                fetched[ticker] = resampled.rename(ticker)
+                continue
+
+        if coverage is None:
+            missing_ranges.setdefault((start_date, end_date), list()).append(ticker)
+            continue
+
+        cached[ticker] = (_normalize_index(pd.read_csv(_cache_file(ticker, interval), index_col=0).iloc[:, 0],
+                                           interval), coverage)
+        covered_start, covered_end = coverage
+
+        overlap_days = OVERLAP_DAYS_INTRADAY if interval in MAX_REQUEST_DAYS else OVERLAP_DAYS
+
+        # Missing head: fetch everything before the cached data plus a small overlap, to check if the cached bars
+        # are still on the same basis as the new ones
+        if start_date < covered_start:
+            overlap_end = min(covered_start + relativedelta(days=overlap_days), covered_end)
+            missing_ranges.setdefault((start_date, overlap_end), list()).append(ticker)
+
+        # Missing tail: fetch the new bars plus a small overlap, to pick up revisions of the adjusted close
+        if end_date > covered_end:
+            overlap_start = max(covered_end - relativedelta(days=overlap_days), covered_start)
+            missing_ranges.setdefault((overlap_start, end_date), list()).append(ticker)
+
+    # Request each missing range for all tickers that need it at once
+    new_data = dict()
+    for (fetch_start, fetch_end), fetch_tickers in missing_ranges.items():
+        downloaded = download_prices(fetch_tickers, fetch_start, fetch_end, interval)
+        for ticker in fetch_tickers:
+            # A ticker that failed inside a bulk download comes back as an empty column, it is not cached (and its
+            # range not marked as covered), so it is requested again next time
+            part = downloaded[ticker].dropna() if ticker in downloaded.columns else None
+            if part is not None and not part.empty:
+                new_data.setdefault(ticker, list()).append((part, fetch_start, fetch_end))
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    for ticker in tickers:
+        if ticker in fetched:
+            continue
+        prices, coverage = cached.get(ticker, (None, None))
+
+        # Merge the new parts into the cached data and save it for later use, only the bars that were cached before
+        # are rescaled when the adjusted close was revised, the new parts are already on the new basis
+        if ticker in new_data:
+            cached_index = prices.index if prices is not None else pd.Index([])
+            for part, fetch_start, fetch_end in new_data[ticker]:
+                prices, coverage = _merge(prices, coverage, part, fetch_start, fetch_end, cached_index)
+            _write_cache(ticker, interval, prices, coverage)
+
+        if prices is not None:
+            fetched[ticker] = _slice(prices, start_date, end_date, interval).rename(ticker)
+
+    return fetched
+
+
+def _load_resampled(ticker, start_date, end_date, interval):
+    """Builds the bars of interval from cached finer bars that cover the whole range, None if there are none"""
+    for base_interval in base_intervals(interval):
+        # The resampled view is cached too, under its own name
+        view = interval + "_from_" + base_interval
+        if _covers(_read_coverage(ticker, view), start_date, end_date):
+            prices = pd.read_csv(_cache_file(ticker, view), index_col=0).iloc[:, 0]
+            return _slice(_normalize_index(prices, interval), start_date, end_date, interval)
+
+        base_coverage = _read_coverage(ticker, base_interval)
+        if _covers(base_coverage, start_date, end_date):
+            base_prices = pd.read_csv(_cache_file(ticker, base_interval), index_col=0).iloc[:, 0]
+            prices = resample_prices(_normalize_index(base_prices, base_interval), base_interval, interval)
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            _write_cache(ticker, view, prices, base_coverage)
+            return _slice(prices, start_date, end_date, interval)
+
+    return None
+
+
+def _covers(coverage, start_date, end_date):
+    """Checks if a cached date range contains the whole requested range"""
+    return coverage is not None and coverage[0] <= start_date and end_date <= coverage[1]
+
+
+def _merge(prices, coverage, part, fetch_start, fetch_end, cached_index):
+    """
+    Merges a newly downloaded part into the cached prices, the new prices win where they overlap
+    :param cached_index: dates of the bars that were in the cache before this fetch, the only ones that are rescaled
+    """
+    if prices is None:
+        return part, (fetch_start, fetch_end)
+
+    # If the adjusted close of the overlapping cached bars changed (e.g. a dividend), rescale the cached bars too
+    overlap = cached_index.intersection(part.index)
+    if not overlap.empty:
+        ratio = part[overlap[0]] / prices[overlap[0]]
+        if abs(ratio - 1) > 1e-9:
+            prices = prices.where(~prices.index.isin(cached_index), prices * ratio)
+
+    prices = pd.concat([prices[~prices.index.isin(part.index)], part]).sort_index()
+    return prices, (min(coverage[0], fetch_start), max(coverage[1], fetch_end))
+
+
+def _slice(prices, start_date, end_date, interval):
+    """Selects the prices from start_date up to (not including) end_date"""
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    if prices.index.tz is not None:
+        start = start.tz_localize(prices.index.tz)
+        end = end.tz_localize(prices.index.tz)
+
+    return prices[(prices.index >= start) & (prices.index < end)]
+
+
+def _read_coverage(ticker, interval):
+    """Reads the date range that the cache of a ticker covers, None if there is no cache yet"""
+    filename = _cache_file(ticker, interval, "json")
+    if not os.path.isfile(filename) or not os.path.isfile(_cache_file(ticker, interval)):
+        return None
+
+    with open(filename) as file:
+        coverage = json.load(file)
+    return datetime.date.fromisoformat(coverage["start"]), datetime.date.fromisoformat(coverage["end"])
+
+
+def _write_cache(ticker, interval, prices, coverage):
+    """Writes the prices and coverage of a ticker, via temporary files so a crash never leaves half written files"""
+    filename = _cache_file(ticker, interval)
+    prices.rename(ticker).to_csv(filename + ".tmp")
+    os.replace(filename + ".tmp", filename)
+
+    # The coverage is written last, so it never claims more than the prices file contains
+    filename = _cache_file(ticker, interval, "json")
+    with open(filename + ".tmp", "w") as file:
+        json.dump({"start": _to_date(coverage[0]).isoformat(), "end": _to_date(coverage[1]).isoformat()}, file)
+    os.replace(filename + ".tmp", filename)
+
+
+def _to_date(date):
+    """Converts a date or datetime to a date"""
+    return date.date() if isinstance(date, datetime.datetime) else date
+
+
+def download_prices(tickers: list, start_date, end_date, interval):
+    """Downloads price data from yahoo finance using loops if more than max data_amount per request is needed"""
+    max_days = MAX_REQUEST_DAYS.get(interval)
+
+    # All intervals of 1 day or more can just download all data at once
+    if max_days is None:
+        return _read_price_data(tickers, start_date, end_date, interval)
+
+    # Divide the total time up into segments of the max request time and download them one after the other
+    df_list = list()
+    current_start_date = start_date
+    while current_start_date < end_date:
+        current_end_date = min(current_start_date + relativedelta(days=max_days), end_date)
+        df_list.append(_read_price_data(tickers, current_start_date, current_end_date, interval))
+        current_start_date = current_end_date
+
+    # Concatenate all the individual dataframes from the list into one dataframe and return it
+    return pd.concat(df_list)
+
+
+def _read_price_data(tickers, start_date, end_date, interval):
+    """Imports price data of all tickers in one request from Yahoo Finance"""
+    # yfinance is only imported when something has to be downloaded, cached runs never need it
+    import yfinance as yf
+
+    try:
+        stock_data = yf.download(tickers, start_date, end_date, interval=interval)
+    except:
+        return pd.DataFrame()
+    if stock_data.empty:
+        return pd.DataFrame()
+
+    prices = stock_data.loc[:, "Adj Close"]
+
+    # A request for one ticker gives a series instead of a dataframe
+    if isinstance(prices, pd.Series):
+        prices = prices.to_frame(tickers[0])
+
+    return _normalize_index(prices, interval)
+
+
+def _normalize_index(prices, interval):
+    """Makes sure downloaded and cached data have the same index: exchange time for intraday, dates otherwise"""
+    if interval in MAX_REQUEST_DAYS:
+        index = pd.to_datetime(prices.index, utc=True).tz_convert("America/New_York")
+    else:
+        index = pd.to_datetime(prices.index)
+
+    return prices.set_axis(index.rename("Date"))
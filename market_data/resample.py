@@ -0,0 +1,61 @@
+import pandas as pd
+
+# Length in minutes of the intraday intervals of Yahoo Finance
+INTRADAY_MINUTES = {"1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "90m": 90, "1h": 60}
+
+# Pandas rules of the intervals of one day or more, labelled by the start of the period like Yahoo Finance does
+PERIOD_RULES = {"1wk": "W-MON", "1mo": "MS", "3mo": "QS"}
+
+# Approximate length in trading minutes of every interval, used to order them from coarse to fine
+BAR_MINUTES = dict(INTRADAY_MINUTES, **{"1d": 390, "1wk": 5 * 390, "1mo": 21 * 390, "3mo": 63 * 390})
+
+# Regular trading session of the US exchanges, intraday bars are aligned to its open
+SESSION_OPEN = "09:30"
+SESSION_CLOSE = "16:00"
+
+
+def can_resample(base_interval, interval):
+    """Checks if bars of interval can be built from bars of base_interval"""
+    if base_interval == interval:
+        return False
+
+    # Intraday bars can be built from intraday bars that fit a whole number of times in them
+    if interval in INTRADAY_MINUTES:
+        return base_interval in INTRADAY_MINUTES and \
+            INTRADAY_MINUTES[interval] % INTRADAY_MINUTES[base_interval] == 0 and \
+            INTRADAY_MINUTES[interval] > INTRADAY_MINUTES[base_interval]
+
+    # Yahoo Finance only adjusts the bars of one day or more for dividends, intraday bars are raw closes. So daily and
+    # longer bars are only built from daily or monthly bars, to keep every series on the same (adjusted) basis
+    if interval in PERIOD_RULES:
+        return base_interval == "1d" or (interval == "3mo" and base_interval == "1mo")
+
+    return False
+
+
+def base_intervals(interval):
+    """Lists the intervals interval can be built from, the coarsest (least data to process) first"""
+    candidates = [base for base in BAR_MINUTES if can_resample(base, interval)]
+
+    return sorted(candidates, key=lambda base: BAR_MINUTES[base], reverse=True)
+
+
+def resample_prices(prices: pd.Series, base_interval, interval):
+    """
+    Builds coarser bars from finer bars, each bar gets the last price of its period
+    :param prices: series of prices with the bars of base_interval
+    :param base_interval: interval of the given prices
+    :param interval: interval of the bars to build
+    :return: series of prices with the bars of interval, empty periods (e.g. weekends) are left out
+    """
+    if not can_resample(base_interval, interval):
+        raise ValueError("Cannot build " + interval + " bars from " + base_interval + " bars")
+
+    # Only use the bars of the regular session, so every bar starts at a whole number of intervals after the open
+    if interval in INTRADAY_MINUTES:
+        prices = prices.between_time(SESSION_OPEN, SESSION_CLOSE, inclusive="left")
+        hours, minutes = SESSION_OPEN.split(":")
+        return prices.resample(str(INTRADAY_MINUTES[interval]) + "min", origin="start_day",
+                               offset=hours + "h" + minutes + "min", label="left", closed="left").last().dropna()
+
+    return prices.resample(PERIOD_RULES[interval], label="left", closed="left").last().dropna()